@@ -0,0 +1 @@
+"""Benchmarks for codex internals."""
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Micro-benchmark cleaning extracted metadata from mock comics."""
+
+import sys
+from copy import deepcopy
+from decimal import ROUND_DOWN, Decimal
+from html import unescape
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any
+
+from comicbox.box import Comicbox
+from comicbox.box.computed import IDENTIFIERS_KEY
+from comicbox.schemas.comicbox_mixin import CONTRIBUTORS_KEY
+from nh3 import clean
+
+from codex.librarian.importer.const import STORY_ARCS_METADATA_KEY
+from codex.librarian.importer.extract import (
+    _DECIMAL_ZERO,
+    _MD_DECIMAL_KEYS,
+    _MD_PSI_KEYS,
+    _MD_STR_KEYS,
+    _PSI_MAX,
+    _SI_MAX,
+    _SI_MIN,
+    ExtractMetadataImporter,
+)
+from codex.models import Comic
+from codex.models.named import (
+    ContributorPerson,
+    ContributorRole,
+    Identifier,
+    IdentifierType,
+    StoryArc,
+)
+from mock_comics.mock_comics import create_test_file
+
+DEFAULT_NUM_COMICS = 500
+DEFAULT_ROUNDS = 5
+
+
+def load_mock_mds(num_comics):
+    """Create mock comics and extract their raw metadata."""
+    mds = []
+    with TemporaryDirectory() as tmp_dir:
+        for index in range(num_comics):
+            path = Path(tmp_dir) / f"{index}.cbz"
+            create_test_file(path)
+            with Comicbox(path) as cb:
+                md = cb.to_dict().get("comicbox", {})
+            md["path"] = str(path)
+            mds.append(md)
+    return mds
+
+
+class PreviousMetadataCleaner(ExtractMetadataImporter):
+    """
+    The metadata cleaner before the precompiled schema.
+
+    Looks up model fields and builds quantize constants for every value and
+    always sanitizes strings.
+    """
+
+    @classmethod
+    def _clean_decimal(cls, value, field_name: str):
+        field = Comic._meta.get_field(field_name)
+        try:
+            quantize_str = Decimal(f"1e-{field.decimal_places}")  # type: ignore[reportAttributeAccessIssue]
+            value = value.quantize(quantize_str, rounding=ROUND_DOWN)
+            decimal_max = Decimal(10 ** (field.max_digits - 2) - 1)  # type: ignore[reportAttributeAccessIssue]
+            value = value.min(decimal_max)
+        except Exception:
+            value = None if field.null else _DECIMAL_ZERO
+        return value
+
+    @classmethod
+    def _clean_comic_decimals(cls, md: dict[str, Any]) -> None:
+        for key in _MD_DECIMAL_KEYS:
+            value = md.get(key)
+            if value is None:
+                continue
+            value = cls._clean_decimal(value, key)
+            cls._assign_or_pop(md, key, value)
+
+    @staticmethod
+    def _clean_int(md, key, minimum, maximum):
+        try:
+            value = md.get(key)
+            if value is not None:
+                value = min(value, maximum)
+                value = max(value, minimum)
+        except Exception:
+            field = Comic._meta.get_field(key)
+            value = None if field.null else 0
+        return value
+
+    @classmethod
+    def _clean_comic_positive_small_ints(cls, md: dict[str, Any]) -> None:
+        for key in _MD_PSI_KEYS:
+            value = cls._clean_int(md, key, 0, _PSI_MAX)
+            cls._assign_or_pop(md, key, value)
+
+    @classmethod
+    def _clean_comic_small_ints(cls, md: dict[str, Any]):
+        obj = md.get("volume", {})
+        key = "name"
+        value = cls._clean_int(obj, key, _SI_MIN, _SI_MAX)
+        cls._assign_or_pop(obj, key, value)
+
+    @staticmethod
+    def _clean_strfield(model, field_name, value):
+        try:
+            if value:
+                value = value.strip()
+                field = model._meta.get_field(field_name)
+                max_length = getattr(field, "max_length", 0)
+                if max_length:
+                    value = value[:max_length]
+                value = clean(value)
+                value = unescape(value)
+            if not value:
+                value = None
+        except Exception:
+            value = None
+        return value
+
+    @classmethod
+    def _clean_strfields(cls, md: dict[str, Any]) -> None:
+        for key in _MD_STR_KEYS:
+            value = md.get(key)
+            value = cls._clean_strfield(Comic, key, value)
+            cls._assign_or_pop(md, key, value)
+
+    @classmethod
+    def _clean_contributors(cls, md):
+        contributors = md.get(CONTRIBUTORS_KEY)
+        if not contributors:
+            return
+        clean_contributors = {}
+        for role, persons in contributors.items():
+            clean_role = cls._clean_strfield(ContributorRole, "name", role)
+            clean_persons = set()
+            for person in persons:
+                clean_person = cls._clean_strfield(ContributorPerson, "name", person)
+                if clean_person:
+                    clean_persons.add(clean_person)
+            clean_contributors[clean_role] = clean_persons
+        cls._assign_or_pop(md, CONTRIBUTORS_KEY, clean_contributors)
+
+    @classmethod
+    def _clean_story_arcs(cls, md):
+        story_arcs = md.get(STORY_ARCS_METADATA_KEY)
+        if not story_arcs:
+            return
+        clean_story_arcs = {}
+        for story_arc, number in story_arcs.items():
+            clean_story_arc = cls._clean_strfield(StoryArc, "name", story_arc)
+            if clean_story_arc:
+                clean_story_arcs[clean_story_arc] = number
+        cls._assign_or_pop(md, STORY_ARCS_METADATA_KEY, clean_story_arcs)
+
+    @classmethod
+    def _clean_identifiers(cls, md):
+        identifiers = md.get(IDENTIFIERS_KEY)
+        if not identifiers:
+            return
+        clean_identifiers = {}
+        for nid, identifier in identifiers.items():
+            clean_id_type = cls._clean_strfield(IdentifierType, "name", nid)
+            nss = identifier.get("nss")
+            clean_nss = cls._clean_strfield(Identifier, "nss", nss)
+            url = identifier.get("url")
+            clean_url = cls._clean_strfield(Identifier, "url", url)
+            if clean_nss:
+                clean_identifier = {"nss": nss}
+                if clean_url:
+                    clean_identifier["url"] = url
+                clean_identifiers[clean_id_type] = clean_identifier
+        cls._assign_or_pop(md, IDENTIFIERS_KEY, clean_identifiers)
+
+    @classmethod
+    def _clean_md(cls, md):
+        cls._title_to_name(md)
+        md = cls._prune_extra_keys(md)
+        cls._clean_comic_positive_small_ints(md)
+        cls._clean_comic_small_ints(md)
+        cls._clean_comic_decimals(md)
+        cls._clean_strfields(md)
+        cls._clean_contributors(md)
+        cls._clean_story_arcs(md)
+        cls._clean_identifiers(md)
+        return md
+
+
+CLEANERS = (
+    ("before", PreviousMetadataCleaner),
+    ("after", ExtractMetadataImporter),
+)
+
+
+def time_clean(cleaner, mds, rounds):
+    """Time cleaning all the metadata for each round."""
+    times = []
+    clean_mds = []
+    for _ in range(rounds):
+        dirty_mds = deepcopy(mds)
+        start = perf_counter()
+        clean_mds = [cleaner._clean_md(md) for md in dirty_mds]
+        times.append(perf_counter() - start)
+    return times, clean_mds
+
+
+def main(args):
+    """Process args and run the benchmark."""
+    try:
+        num_comics = int(args[1]) if len(args) > 1 else DEFAULT_NUM_COMICS
+        rounds = int(args[2]) if len(args) > 2 else DEFAULT_ROUNDS  # noqa: PLR2004
+    except Exception:
+        print(f"{args[0]} [num_comics] [rounds]")
+        sys.exit(1)
+
+    mds = load_mock_mds(num_comics)
+    print(f"Cleaned {num_comics} mock comics x {rounds} rounds")
+    bests = {}
+    outputs = {}
+    for name, cleaner in CLEANERS:
+        times, outputs[name] = time_clean(cleaner, mds, rounds)
+        best = bests[name] = min(times)
+        print(f"{name}:")
+        print(
+            f"  best:   {best * 1000:.1f} ms ({best / num_comics * 1e6:.1f} us/comic)"
+        )
+        print(f"  median: {median(times) * 1000:.1f} ms")
+    print(f"speedup: {bests['before'] / bests['after']:.1f}x")
+    if outputs["before"] != outputs["after"]:
+        print("Cleaned metadata differs between before and after.")
+        sys.exit(1)
+    print("Cleaned metadata is identical.")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
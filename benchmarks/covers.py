@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark cover thumbnail creation.
+
+Compares a 1x thumbnail with and without a reduced resolution decode, and
+every size variant from one decode against a decode for each size.
+"""
+
+import json
+import resource
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from multiprocessing import get_context
+from pathlib import Path
+from time import process_time
+from types import MappingProxyType
+
+from PIL import Image, ImageChops, ImageStat
+
+# Common page scan formats and sizes.
+SCANS = (
+    ("JPEG", (1600, 2460)),
+    ("JPEG", (1988, 3056)),
+    ("JPEG", (2650, 4096)),
+    ("PNG", (1988, 3056)),
+)
+KB = 1024
+
+
+def create_scan(index, image_format, size):
+    """Create a repeatable page scan."""
+    noise = Image.effect_noise((size[0] // 8, size[1] // 8), 64)
+    colors = tuple(
+        Image.linear_gradient("L").rotate(index * 37 + offset).resize(noise.size)
+        for offset in (0, 90)
+    )
+    scan = Image.merge("RGB", (noise, *colors)).resize(size, Image.Resampling.BICUBIC)
+    buffer = BytesIO()
+    scan.save(buffer, image_format, quality=90)
+    return buffer.getvalue()
+
+
+def _get_max_rss_kb():
+    # Children inherit the parent's peak, so the parent never imports codex.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _create_thumbnail(cover_image, size, *, draft):
+    """Create one thumbnail from an open image the way codex encodes it."""
+    from codex.librarian.covers.create import (
+        _COVER_PROFILE_ENCODINGS,
+        _REDUCING_GAP,
+        COVER_SIZE_DIMENSIONS,
+        CoverCreateThread,
+        _get_thumbnail_size,
+    )
+    from codex.librarian.covers.path import COVER_PROFILE_BEST
+
+    encoding = _COVER_PROFILE_ENCODINGS[COVER_PROFILE_BEST]
+    dimensions = COVER_SIZE_DIMENSIONS[size]
+    thumb_size = _get_thumbnail_size(*cover_image.size, dimensions)
+    box = (
+        CoverCreateThread._draft_cover_image(cover_image, dimensions) if draft else None
+    )
+    with cover_image.resize(
+        thumb_size or cover_image.size,
+        encoding["resample"],
+        box=box,
+        reducing_gap=_REDUCING_GAP,
+    ) as thumb_image:
+        return CoverCreateThread._save_cover_thumbnail(thumb_image, size, encoding)
+
+
+def _create_decoded_thumbnails(cover_image_data, sizes, *, draft):
+    """Decode the scan once for each size."""
+    thumbs = []
+    for size in sizes:
+        with BytesIO(cover_image_data) as image_io, Image.open(image_io) as cover_image:
+            thumbs.append(_create_thumbnail(cover_image, size, draft=draft))
+    return thumbs
+
+
+def _create_1x_full_decode(cover_image_data):
+    from codex.librarian.covers.path import COVER_SIZE_1X
+
+    return _create_decoded_thumbnails(cover_image_data, (COVER_SIZE_1X,), draft=False)
+
+
+def _create_1x_draft(cover_image_data):
+    from codex.librarian.covers.path import COVER_SIZE_1X
+
+    return _create_decoded_thumbnails(cover_image_data, (COVER_SIZE_1X,), draft=True)
+
+
+def _create_variants_separate_decodes(cover_image_data):
+    from codex.librarian.covers.create import COVER_SIZE_DIMENSIONS
+
+    return _create_decoded_thumbnails(
+        cover_image_data, COVER_SIZE_DIMENSIONS, draft=True
+    )
+
+
+def _create_variants_one_decode(cover_image_data):
+    from codex.librarian.covers.create import COVER_SIZE_DIMENSIONS, CoverCreateThread
+
+    thumbnails = CoverCreateThread.create_thumbnails(cover_image_data)
+    return [thumbnails[size] for size in COVER_SIZE_DIMENSIONS]
+
+
+# Each comparison runs a before and an after mode over the same scans.
+COMPARISONS = MappingProxyType(
+    {
+        # A single 1x thumbnail without and with a reduced resolution decode.
+        "1x": MappingProxyType(
+            {"full_decode": _create_1x_full_decode, "draft": _create_1x_draft}
+        ),
+        # Every variant from a decode each or from one decode.
+        "variants": MappingProxyType(
+            {
+                "separate_decodes": _create_variants_separate_decodes,
+                "one_decode": _create_variants_one_decode,
+            }
+        ),
+    }
+)
+
+
+def run_mode(comparison, mode, image_format, scans):
+    """Thumbnail every scan in a fresh process and measure it."""
+    create_thumbnails = COMPARISONS[comparison][mode]
+    # Warm up codecs with a small image so it doesn't set the peak.
+    create_thumbnails(create_scan(0, image_format, (64, 96)))
+    start_rss_kb = _get_max_rss_kb()
+    start = process_time()
+    thumbs = [thumb for scan in scans for thumb in create_thumbnails(scan)]
+    cpu_seconds = process_time() - start
+    return {
+        "cpu_ms_per_cover": round(cpu_seconds * 1000 / len(scans), 2),
+        "peak_rss_mb_over_baseline": round((_get_max_rss_kb() - start_rss_kb) / KB, 1),
+    }, thumbs
+
+
+def _get_thumb_difference(before_thumbs, after_thumbs):
+    """Get the worst mean pixel difference between two modes."""
+    worst = 0.0
+    for before_thumb, after_thumb in zip(before_thumbs, after_thumbs, strict=True):
+        with (
+            Image.open(BytesIO(before_thumb)) as before_image,
+            Image.open(BytesIO(after_thumb)) as after_image,
+        ):
+            if before_image.size != after_image.size:
+                return None
+            diff = ImageChops.difference(
+                before_image.convert("RGB"), after_image.convert("RGB")
+            )
+            worst = max(worst, *ImageStat.Stat(diff).mean)
+    return round(worst, 2)
+
+
+def _run_in_process(func, *args):
+    """Run in a fresh process to keep peak memory measurements separate."""
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(func, *args).result()
+
+
+def create_scans(num_covers, image_format, size):
+    """Create page scans."""
+    return [create_scan(index, image_format, size) for index in range(num_covers)]
+
+
+def _run_comparison(comparison, modes, image_format, scans):
+    """Run both modes of a comparison and compare their thumbnails."""
+    scan_report = {}
+    mode_thumbs = []
+    for mode in modes:
+        scan_report[mode], thumbs = _run_in_process(
+            run_mode, comparison, mode, image_format, scans
+        )
+        mode_thumbs.append(thumbs)
+    before, after = (scan_report[mode]["cpu_ms_per_cover"] for mode in modes)
+    scan_report["speedup"] = round(before / after, 2)
+    scan_report["max_mean_pixel_difference"] = _get_thumb_difference(*mode_thumbs)
+    return scan_report
+
+
+def get_args(argv):
+    """Parse arguments."""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("num_covers", type=int, nargs="?", default=20)
+    parser.add_argument(
+        "-o", "--output", type=Path, help="Write the JSON report to this file"
+    )
+    return parser.parse_args(argv[1:])
+
+
+def main(argv):
+    """Create scans, thumbnail them each way and report."""
+    args = get_args(argv)
+    report = {"num_covers": args.num_covers, "comparisons": {}}
+    for comparison in COMPARISONS:
+        report["comparisons"][comparison] = {}
+    for image_format, size in SCANS:
+        # Children inherit the parent's peak, so the parent never decodes scans.
+        scans = _run_in_process(create_scans, args.num_covers, image_format, size)
+        for comparison, modes in COMPARISONS.items():
+            report["comparisons"][comparison][f"{image_format} {size[0]}x{size[1]}"] = (
+                _run_comparison(comparison, modes, image_format, scans)
+            )
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(report_json + "\n")
+    print(report_json)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
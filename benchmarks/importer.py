@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Benchmark importing mock comics into a scratch config, stage by stage."""
+
+import json
+import os
+import platform
+import random
+import sys
+from argparse import ArgumentParser
+from contextlib import contextmanager, suppress
+from multiprocessing import cpu_count
+from pathlib import Path
+from queue import SimpleQueue
+from tempfile import TemporaryDirectory
+from threading import Event, Lock, Thread
+from time import perf_counter
+
+from psutil import NoSuchProcess, Process
+
+from mock_comics import mock_comics
+
+# Importer method names timed for each stage.
+STAGES = {
+    "aggregate": ("get_aggregate_metadata",),
+    "query_fks": ("query_all_missing_fks",),
+    "create_fks": ("create_all_fks",),
+    "create_update": ("bulk_update_comics", "bulk_create_comics"),
+    "covers": ("save_cover_thumbnails",),
+    "link": ("bulk_query_and_link_comic_m2m_fields",),
+    "groups": ("update_touched_groups",),
+}
+RSS_SAMPLE_INTERVAL = 0.01
+MB = 1024 * 1024
+
+
+def set_metadata_density(density):
+    """Scale how much metadata the mock comics carry, from 0.0 to 1.0."""
+    mock_comics.CHANCE_OF_NULL = 1.0 - density
+    # Keep some badly typed values so cleaning is exercised.
+    mock_comics.CHANCE_OF_BAD_TYPE = min(mock_comics.CHANCE_OF_NULL + 0.1, 1.0)
+    mock_comics.NUM_M2M_NAMES = round(20 * density)
+    mock_comics.NUM_CONTRIBUTORS = round(15 * density)
+
+
+def create_mock_comics(root, num_comics, density, seed):
+    """Create a repeatable set of mock comics."""
+    random.seed(seed)
+    set_metadata_density(density)
+    for index in range(num_comics):
+        mock_comics.create_file(root, index)
+
+
+class RSSSampler(Thread):
+    """Sample the resident memory of this process and its workers."""
+
+    def __init__(self):
+        """Initialize peaks."""
+        super().__init__(daemon=True)
+        self._process = Process()
+        self._stop_event = Event()
+        self._lock = Lock()
+        # One running peak for each stage in progress, nested stages included.
+        self._peaks = []
+
+    def _get_rss(self):
+        rss = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            with suppress(NoSuchProcess):
+                rss += child.memory_info().rss
+        return rss
+
+    def _sample(self):
+        rss = self._get_rss()
+        with self._lock:
+            self._peaks = [max(peak, rss) for peak in self._peaks]
+
+    def push(self):
+        """Start a peak measurement for a stage."""
+        rss = self._get_rss()
+        with self._lock:
+            self._peaks.append(rss)
+
+    def pop(self):
+        """Finish the innermost stage's peak measurement."""
+        self._sample()
+        with self._lock:
+            return self._peaks.pop()
+
+    def run(self):
+        """Sample until stopped."""
+        while not self._stop_event.wait(RSS_SAMPLE_INTERVAL):
+            self._sample()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop_event.set()
+        self.join()
+
+
+class StageRecorder:
+    """Record wall time, query count and peak memory for named stages."""
+
+    def __init__(self, connection):
+        """Initialize counters."""
+        self._connection = connection
+        self._queries = 0
+        self._sampler = RSSSampler()
+        self.results = {}
+
+    def _count_query(self, execute, sql, params, many, context):
+        self._queries += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def stage(self, name):
+        """Record one run of a stage."""
+        result = self.results.setdefault(
+            name, {"calls": 0, "seconds": 0.0, "queries": 0, "peak_rss_mb": 0.0}
+        )
+        self._sampler.push()
+        start_queries = self._queries
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            result["calls"] += 1
+            result["seconds"] += perf_counter() - start
+            result["queries"] += self._queries - start_queries
+            peak_rss_mb = round(self._sampler.pop() / MB, 1)
+            result["peak_rss_mb"] = max(result["peak_rss_mb"], peak_rss_mb)
+
+    def wrap(self, obj, stage_name, method_name):
+        """Record every call of an object's method as a stage."""
+        method = getattr(obj, method_name)
+
+        def recorded(*args, **kwargs):
+            with self.stage(stage_name):
+                return method(*args, **kwargs)
+
+        setattr(obj, method_name, recorded)
+
+    @contextmanager
+    def recording(self):
+        """Count queries and sample memory while recording."""
+        self._sampler.start()
+        try:
+            with self._connection.execute_wrapper(self._count_query):
+                yield
+        finally:
+            self._sampler.stop()
+
+
+def run_import(library_path, recorder):
+    """Import the library and update the search index."""
+    from codex.db import ensure_db_schema
+    from codex.librarian.importer.importer import ComicImporter
+    from codex.librarian.importer.tasks import ImportDBDiffTask
+    from codex.librarian.search.searchd import SearchIndexerThread
+    from codex.logger.mp_queue import LOG_QUEUE
+    from codex.models import Library
+    from codex.startup import ensure_db_rows
+
+    ensure_db_schema()
+    ensure_db_rows()
+    library = Library.objects.create(path=str(library_path))
+    paths = frozenset(str(path) for path in library_path.rglob("*.cbz"))
+    # Worker pools are spawned and log through the spawn context queue.
+    log_queue = LOG_QUEUE
+    # Nothing consumes librarian tasks, so don't buffer them in a pipe.
+    librarian_queue = SimpleQueue()
+
+    task = ImportDBDiffTask(library_id=library.pk, files_created=paths)
+    importer = ComicImporter(task, log_queue, librarian_queue)
+    for stage_name, method_names in STAGES.items():
+        for method_name in method_names:
+            recorder.wrap(importer, stage_name, method_name)
+    indexer = SearchIndexerThread(
+        Event(), log_queue=log_queue, librarian_queue=librarian_queue
+    )
+
+    with recorder.recording():
+        with recorder.stage("import"):
+            importer.apply()
+        with recorder.stage("search_index"):
+            indexer.update_search_index(rebuild=False)
+
+
+def get_report(args, recorder):
+    """Create the report."""
+    from comicbox.version import VERSION as COMICBOX_VERSION
+
+    from codex.version import VERSION
+
+    import_seconds = recorder.results["import"]["seconds"]
+    for result in recorder.results.values():
+        result["seconds"] = round(result["seconds"], 3)
+    return {
+        "codex_version": VERSION,
+        "comicbox_version": COMICBOX_VERSION,
+        "python": platform.python_version(),
+        "cpu_count": cpu_count(),
+        "num_comics": args.num_comics,
+        "density": args.density,
+        "seed": args.seed,
+        "import_covers": args.covers,
+        "comics_per_second": round(args.num_comics / import_seconds, 1),
+        "stages": recorder.results,
+    }
+
+
+def get_args(argv):
+    """Parse arguments."""
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("num_comics", type=int, nargs="?", default=500)
+    parser.add_argument(
+        "-d",
+        "--density",
+        type=float,
+        default=0.3,
+        help=(
+            "Metadata density from 0.0 (no tags) to 1.0 (every tag), default 0.3."
+            " Search indexing slows sharply on dense m2m tags."
+        ),
+    )
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument(
+        "-c",
+        "--covers",
+        action="store_true",
+        help="Create cover thumbnails during import",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, help="Write the JSON report to this file"
+    )
+    return parser.parse_args(argv[1:])
+
+
+def main(argv):
+    """Generate mock comics, import them and report."""
+    args = get_args(argv)
+    with TemporaryDirectory(prefix="codex-benchmark-") as tmp_dir:
+        tmp_path = Path(tmp_dir)
+        library_path = tmp_path / "library"
+        create_mock_comics(library_path, args.num_comics, args.density, args.seed)
+
+        os.environ["CODEX_CONFIG_DIR"] = str(tmp_path / "config")
+        os.environ.setdefault("LOGLEVEL", "WARNING")
+        if args.covers:
+            os.environ["CODEX_IMPORT_COVERS"] = "1"
+        from django.db import connection
+
+        # Codex reads its config dir when first imported.
+        import codex  # noqa: F401
+        from codex.logger.loggerd import CodexLogQueueListener
+        from codex.logger.mp_queue import LOG_QUEUE
+
+        # Drain the log queue so workers never block on a full pipe.
+        loggerd = CodexLogQueueListener(LOG_QUEUE)
+        loggerd.start()
+        try:
+            recorder = StageRecorder(connection)
+            run_import(library_path, recorder)
+            report = get_report(args, recorder)
+        finally:
+            loggerd.stop()
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(report_json + "\n")
+    print(report_json)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
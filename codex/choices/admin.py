@@ -82,6 +82,16 @@ ADMIN_TASK_GROUPS = MappingProxyType(
                         "desc": "Pre-generate covers for every comic in every library and all custom covers",
                         "confirm": "Are you sure?",
                     },
+                    {
+                        "value": "pack_covers",
+                        "title": "Pack Cover Thumbnails",
+                        "desc": "Move cover thumbnail files into cover packs. Runs on startup if cover packs are enabled.",
+                    },
+                    {
+                        "value": "compact_cover_packs",
+                        "title": "Compact Cover Packs",
+                        "desc": "Reclaim space from removed covers in cover packs. Runs nightly.",
+                    },
                     {
                         "value": "force_update_groups",
                         "title": "Update Group Timestamps",
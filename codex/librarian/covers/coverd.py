@@ -1,23 +1,102 @@
 """Functions for dealing with comic cover thumbnails."""
 
-from codex.librarian.covers.purge import CoverPurgeThread
+from time import time
+
+from codex.librarian.covers.pack import COVER_PACK
+from codex.librarian.covers.prewarm import CoverPrewarmThread
 from codex.librarian.covers.tasks import (
     CoverCreateAllTask,
+    CoverPackCompactTask,
+    CoverPackMigrateTask,
+    CoverPrewarmTask,
+    CoverReencodeTask,
     CoverRemoveAllTask,
     CoverRemoveOrphansTask,
     CoverRemoveTask,
     CoverSaveToCache,
 )
+from codex.models import Library
 
 
-class CoverThread(CoverPurgeThread):
+class CoverThread(CoverPrewarmThread):
     """Create comic covers in it's own thread."""
 
+    # Wait for the queue to go quiet before re-encoding.
+    REENCODE_IDLE_DELAY = 5.0
+    # Throttle between batches so on demand covers stay responsive.
+    REENCODE_BATCH_DELAY = 1.0
+    REENCODE_BATCH_SIZE = 20
+
+    def __init__(self, *args, **kwargs):
+        """Initialize re-encode state."""
+        super().__init__(*args, **kwargs)
+        self._reencode_keys = set()
+        self._reencode_failed_keys = set()
+        self._next_reencode_time = time() + self.REENCODE_IDLE_DELAY
+
+    def run_start(self):
+        """Move covers into the packed store if it was just enabled."""
+        super().run_start()
+        if COVER_PACK and (
+            self.COVERS_ROOT.is_dir() or self.CUSTOM_COVERS_ROOT.is_dir()
+        ):
+            self.queue.put(CoverPackMigrateTask())
+
+    def _get_reencode_timeout(self):
+        """Get the time until the next re-encode batch, if there is one."""
+        if not self._reencode_keys:
+            return None
+        return max(0.0, self._next_reencode_time - time())
+
+    def get_timeout(self):
+        """Wake up only while there are covers to pre-warm or re-encode."""
+        timeouts = tuple(
+            timeout
+            for timeout in (self.get_prewarm_timeout(), self._get_reencode_timeout())
+            if timeout is not None
+        )
+        return min(timeouts, default=None)
+
+    def _add_reencode_task(self, task):
+        """Schedule a fast profile cover for re-encoding."""
+        key = (task.pk, task.custom)
+        if key in self._reencode_failed_keys:
+            return
+        self._reencode_keys.add(key)
+        self._next_reencode_time = time() + self.REENCODE_IDLE_DELAY
+
+    def _reencode_covers(self):
+        """Re-encode one throttled batch of fast profile covers."""
+        if Library.objects.filter(update_in_progress=True).exists():
+            self._next_reencode_time = time() + self.REENCODE_IDLE_DELAY
+            return
+        self._next_reencode_time = time() + self.REENCODE_BATCH_DELAY
+        count = 0
+        for _ in range(min(self.REENCODE_BATCH_SIZE, len(self._reencode_keys))):
+            if self._shutdown_event.is_set():
+                break
+            key = self._reencode_keys.pop()
+            if self.reencode_cover(*key):
+                count += 1
+            else:
+                self._reencode_failed_keys.add(key)
+        if count:
+            self.log.debug(f"Re-encoded {count} covers with the best profile.")
+
+    def timed_out(self):
+        """Pre-warm and re-encode throttled batches of covers when due."""
+        if self._prewarm_keys:
+            self.prewarm_covers()
+        if self._reencode_keys and time() >= self._next_reencode_time:
+            self._reencode_covers()
+
     def process_item(self, item):
         """Run the task method."""
         task = item
         if isinstance(task, CoverSaveToCache):
-            self.save_cover_to_cache(task.cover_path, task.data)
+            self.save_covers_to_cache((task,))
+        elif isinstance(task, CoverReencodeTask):
+            self._add_reencode_task(task)
         elif isinstance(task, CoverRemoveAllTask):
             self.purge_all_comic_covers(self.librarian_queue)
         elif isinstance(task, CoverRemoveTask):
@@ -26,5 +105,11 @@ class CoverThread(CoverPurgeThread):
             self.cleanup_orphan_covers()
         elif isinstance(task, CoverCreateAllTask):
             self.create_all_covers()
+        elif isinstance(task, CoverPrewarmTask):
+            self.add_prewarm_task(task)
+        elif isinstance(task, CoverPackMigrateTask):
+            self.migrate_covers_to_pack()
+        elif isinstance(task, CoverPackCompactTask):
+            self.compact_cover_packs()
         else:
             self.log.error(f"Bad task sent to {self.__class__.__name__}: {task}")
@@ -1,43 +1,181 @@
 """Create comic cover paths."""
 
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
 from io import BytesIO
+from itertools import islice
+from math import ceil, floor
+from multiprocessing import cpu_count, get_context
 from pathlib import Path
+from threading import Event
 from time import time
+from types import MappingProxyType
 
 from comicbox.box import Comicbox
 from humanize import naturaldelta
 from PIL import Image
 
-from codex.librarian.covers.path import CoverPathMixin
+from codex.librarian.covers.manifest import COVER_MANIFEST
+from codex.librarian.covers.pack import COVER_PACK
+from codex.librarian.covers.path import (
+    COVER_PROFILE_BEST,
+    COVER_PROFILE_FAST,
+    COVER_SIZE_1X,
+    COVER_SIZE_2X,
+    COVER_SIZE_SUFFIXES,
+    COVER_SIZE_TINY,
+    CoverPathMixin,
+)
+from codex.librarian.covers.single_flight import CoverSingleFlight
 from codex.librarian.covers.status import CoverStatusTypes
-from codex.librarian.covers.tasks import CoverSaveToCache
+from codex.librarian.covers.tasks import CoverReencodeTask, CoverSaveToCache
+from codex.logger.logger import get_logger
 from codex.models import Comic, CustomCover
+from codex.settings.settings import COVER_WORKERS, CPU_MULTIPLIER, FILTER_BATCH_SIZE
 from codex.status import Status
 from codex.threads import QueuedThread
 
 _COVER_RATIO = 1.5372233400402415  # modal cover ratio
 THUMBNAIL_WIDTH = 165
 THUMBNAIL_HEIGHT = round(THUMBNAIL_WIDTH * _COVER_RATIO)
-_THUMBNAIL_SIZE = (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+_TINY_WIDTH = 24
+# Largest first, each variant is resampled from the one before.
+COVER_SIZE_DIMENSIONS = MappingProxyType(
+    {
+        COVER_SIZE_2X: (THUMBNAIL_WIDTH * 2, THUMBNAIL_HEIGHT * 2),
+        COVER_SIZE_1X: (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT),
+        COVER_SIZE_TINY: (_TINY_WIDTH, round(_TINY_WIDTH * _COVER_RATIO)),
+    }
+)
+# JPEG 2000 resolution levels to discard at most, matching JPEG's 1/8 scale.
+_JPEG2000_MAX_REDUCE = 3
+_REDUCING_GAP = 3.0
+_COVER_MAX_WORKERS = COVER_WORKERS or max(1, int(cpu_count() * CPU_MULTIPLIER))
+# Small batches aren't worth the cost of starting worker processes.
+_COVER_POOL_MIN_PKS = 32
+# Bound the number of submitted and unconsumed results in memory.
+_COVER_MAX_IN_FLIGHT_PER_WORKER = 4
+# How often to check for shutdown while waiting on workers.
+_SHUTDOWN_POLL_TIMEOUT = 1.0
+# Fast encodes ~5x quicker for in request covers, best is ~10% smaller.
+_COVER_PROFILE_ENCODINGS = MappingProxyType(
+    {
+        COVER_PROFILE_BEST: MappingProxyType(
+            {"resample": Image.Resampling.LANCZOS, "method": 6}
+        ),
+        COVER_PROFILE_FAST: MappingProxyType(
+            {"resample": Image.Resampling.BICUBIC, "method": 0}
+        ),
+    }
+)
+# Method 6 costs 3x method 4 at 2x for a ~2% smaller file.
+_COVER_SIZE_MAX_METHODS = MappingProxyType({COVER_SIZE_2X: 4})
+_COVER_SINGLE_FLIGHT = CoverSingleFlight()
+
+
+def _round_aspect(number, key):
+    return max(min(floor(number), ceil(number), key=key), 1)
+
+
+def _get_thumbnail_size(width, height, size):
+    """Get the size Image.thumbnail() makes from the full size image."""
+    # Computed before drafting, which rounds the image size.
+    x, y = size
+    if x >= width and y >= height:
+        return None
+    aspect = width / height
+    if x / y >= aspect:
+        x = _round_aspect(y * aspect, key=lambda n: abs(aspect - n / y))
+    else:
+        y = _round_aspect(
+            x / aspect, key=lambda n: 0 if n == 0 else abs(aspect - x / n)
+        )
+    return x, y
+
+
+def _init_cover_worker(log_queue):
+    """Send cover worker process logs to the codex log queue."""
+    get_logger(None, log_queue)
 
 
 class CoverCreateThread(QueuedThread, CoverPathMixin):
     """Create methods for covers."""
 
+    def __init__(self, *args, **kwargs):
+        """Initialize the shutdown event."""
+        self._shutdown_event = Event()
+        super().__init__(*args, **kwargs)
+
+    def stop(self):
+        """Stop bulk cover creation and the thread."""
+        self._shutdown_event.set()
+        super().stop()
+
+    @staticmethod
+    def _draft_cover_image(cover_image, size):
+        """
+        Decode only the resolution a thumbnail of size needs, where the format can.
+
+        Return the box of the full image in drafted pixels.
+        """
+        # The same scale Image.thumbnail() drafts to, so output is unchanged.
+        draft_size = (int(size[0] * _REDUCING_GAP), int(size[1] * _REDUCING_GAP))
+        if cover_image.format == "JPEG":
+            # DCT scaling by 1/2, 1/4 or 1/8, as Image.thumbnail() does.
+            if draft := cover_image.draft(None, draft_size):
+                return draft[1]
+        elif cover_image.format == "JPEG2000":
+            # Image.thumbnail() can't draft these. Skip resolution levels.
+            width, height = cover_image.size
+            scale = min(width // draft_size[0], height // draft_size[1])
+            if scale < 2:  # noqa: PLR2004
+                return None
+            reduce = min(scale.bit_length() - 1, _JPEG2000_MAX_REDUCE)
+            cover_image.reduce = reduce
+            scale = 1 << reduce
+            return (0, 0, width / scale, height / scale)
+        return None
+
+    @staticmethod
+    def _save_cover_thumbnail(thumb_image, size, encoding):
+        """Encode one thumbnail."""
+        method = encoding["method"]
+        method = min(method, _COVER_SIZE_MAX_METHODS.get(size, method))
+        with BytesIO() as cover_thumb_buffer:
+            thumb_image.save(cover_thumb_buffer, "WEBP", method=method)
+            return cover_thumb_buffer.getvalue()
+
     @classmethod
-    def _create_cover_thumbnail(cls, cover_image_data):
-        """Isolate the save thumbnail function for leak detection."""
-        cover_thumb_buffer = BytesIO()
+    def create_thumbnails(cls, cover_image_data, profile=COVER_PROFILE_BEST):
+        """Create every size of cover thumbnail bytes from one decode."""
+        encoding = _COVER_PROFILE_ENCODINGS[profile]
+        thumbnails = {}
         with BytesIO(cover_image_data) as image_io:
             with Image.open(image_io) as cover_image:
-                cover_image.thumbnail(
-                    _THUMBNAIL_SIZE,
-                    Image.Resampling.LANCZOS,
-                    reducing_gap=3.0,
+                full_size = cover_image.size
+                box = cls._draft_cover_image(
+                    cover_image, COVER_SIZE_DIMENSIONS[COVER_SIZE_2X]
                 )
-                cover_image.save(cover_thumb_buffer, "WEBP", method=6)
+                source_image = cover_image
+                for size, dimensions in COVER_SIZE_DIMENSIONS.items():
+                    if thumb_size := _get_thumbnail_size(*full_size, dimensions):
+                        thumb_image = source_image.resize(
+                            thumb_size,
+                            encoding["resample"],
+                            box=box,
+                            reducing_gap=_REDUCING_GAP,
+                        )
+                        if source_image is not cover_image:
+                            source_image.close()
+                        source_image = thumb_image
+                        box = None
+                    thumbnails[size] = cls._save_cover_thumbnail(
+                        source_image, size, encoding
+                    )
+                if source_image is not cover_image:
+                    source_image.close()
             cover_image.close()  # extra close for animated sequences
-        return cover_thumb_buffer
+        return thumbnails
 
     @classmethod
     def _get_comic_cover_image(cls, comic_path):
@@ -60,45 +198,214 @@ class CoverCreateThread(QueuedThread, CoverPathMixin):
             return f.read()
 
     @classmethod
-    def create_cover_from_path(cls, pk, cover_path, log, librarian_queue, custom):
-        """
-        Create cover for path.
+    def create_cover_thumbnails(cls, db_path, custom, profile=COVER_PROFILE_BEST):
+        """Create cover thumbnails from a source path. Runs in worker processes."""
+        if custom:
+            cover_image = cls._get_custom_cover_image(db_path)
+        else:
+            cover_image = cls._get_comic_cover_image(db_path)
+        return cls.create_thumbnails(cover_image, profile)
 
-        Called from views/cover.
-        """
+    @classmethod
+    def get_cover_save_tasks(cls, pk, custom, thumbnails, profile=COVER_PROFILE_BEST):
+        """Get save tasks for every size, or missing markers if there are none."""
+        if not thumbnails:
+            # Missing cover markers never need re-encoding.
+            profile = COVER_PROFILE_BEST
+        return tuple(
+            CoverSaveToCache(pk, custom, profile, size, thumbnails.get(size, b""))
+            for size in COVER_SIZE_SUFFIXES
+        )
+
+    @classmethod
+    def _create_fast_cover_thumbnails(cls, pk, custom, log):
+        """Create every size of a cover with the fast profile."""
         db_path = None
         try:
             model = CustomCover if custom else Comic
             db_path = model.objects.only("path").get(pk=pk).path
-            if custom:
-                cover_image = cls._get_custom_cover_image(db_path)
-            else:
-                cover_image = cls._get_comic_cover_image(db_path)
-            thumb_buffer = cls._create_cover_thumbnail(cover_image)
-            thumb_bytes = thumb_buffer.getvalue()
-            thumb_buffer.seek(0)
+            return cls.create_cover_thumbnails(db_path, custom, COVER_PROFILE_FAST)
         except Exception as exc:
-            thumb_bytes = b""
-            thumb_buffer = None
             cover_str = db_path if db_path else f"{pk=}"
             log.warning(f"Could not create cover thumbnail for {cover_str}: {exc}")
+            return {}
+
+    @classmethod
+    def create_cover_from_path(cls, pk, log, librarian_queue, custom, size):
+        """
+        Create covers for path with the fast profile.
+
+        Called from views/cover.
+        """
+        # Concurrent requests for the same cover wait for one creation.
+        thumbnails, created = _COVER_SINGLE_FLIGHT.do(
+            (pk, custom),
+            partial(cls._create_fast_cover_thumbnails, pk, custom, log),
+        )
+        if created:
+            for task in cls.get_cover_save_tasks(
+                pk, custom, thumbnails, COVER_PROFILE_FAST
+            ):
+                librarian_queue.put(task)
+            if thumbnails:
+                librarian_queue.put(CoverReencodeTask(pk, custom))
+        if not thumbnails:
+            return None
+        return BytesIO(thumbnails[size])
+
+    def save_covers_to_cache(self, tasks):
+        """Save cover thumb images to the cache."""
+        if COVER_PACK:
+            COVER_PACK.put_many(
+                (
+                    task.pk,
+                    task.custom,
+                    self.get_cover_variant(task.profile, task.size),
+                    task.data,
+                )
+                for task in tasks
+            )
+        else:
+            for task in tasks:
+                cover_path = self.get_cover_path(
+                    task.pk, task.custom, task.profile, task.size
+                )
+                cover_path.parent.mkdir(exist_ok=True, parents=True)
+                if task.data:
+                    with cover_path.open("wb") as cover_file:
+                        cover_file.write(task.data)
+                elif not cover_path.exists():
+                    # zero length file is code for missing.
+                    cover_path.touch()
+        COVER_MANIFEST.add({(task.pk, task.custom) for task in tasks})
+
+    def _cover_sizes_exist(self, pk, custom, profile=COVER_PROFILE_BEST):
+        """Return if every size of a profile is in the cache."""
+        return all(
+            self.cover_exists(pk, custom, profile, size) for size in COVER_SIZE_SUFFIXES
+        )
+
+    def _fast_covers_exist(self, pk, custom):
+        """Return if any fast profile size is in the cache."""
+        return any(
+            self.cover_exists(pk, custom, COVER_PROFILE_FAST, size)
+            for size in COVER_SIZE_SUFFIXES
+        )
 
-        task = CoverSaveToCache(cover_path, thumb_bytes)
-        librarian_queue.put(task)
-        return thumb_buffer
+    def _remove_fast_covers(self, pk, custom):
+        """Remove every fast profile size from the cache."""
+        if COVER_PACK:
+            variants = tuple(
+                self.get_cover_variant(COVER_PROFILE_FAST, size)
+                for size in COVER_SIZE_SUFFIXES
+            )
+            COVER_PACK.remove((pk,), custom, variants)
+            return
+        fast_size_paths = self.get_cover_size_paths(pk, custom, COVER_PROFILE_FAST)
+        for fast_path in fast_size_paths.values():
+            fast_path.unlink(missing_ok=True)
+
+    def _save_cover_thumbnails(self, pk, custom, thumbnails):
+        """Save best profile thumbnails and remove fast profile ones."""
+        self.save_covers_to_cache(self.get_cover_save_tasks(pk, custom, thumbnails))
+        self._remove_fast_covers(pk, custom)
 
-    def save_cover_to_cache(self, cover_path, data):
-        """Save cover thumb image to the disk cache."""
-        cover_path.parent.mkdir(exist_ok=True, parents=True)
-        if data:
-            with cover_path.open("wb") as cover_file:
-                cover_file.write(data)
-        elif not cover_path.exists():
-            # zero length file is code for missing.
-            cover_path.touch()
+    def _get_missing_cover_db_paths(self, pks, custom, status):
+        """Yield pk and source path for covers not yet in the cache."""
+        model = CustomCover if custom else Comic
+        for start in range(0, len(pks), FILTER_BATCH_SIZE):
+            batch_pks = pks[start : start + FILTER_BATCH_SIZE]
+            db_paths = dict(
+                model.objects.filter(pk__in=batch_pks).values_list("pk", "path")
+            )
+            for pk in batch_pks:
+                db_path = db_paths.get(pk)
+                if db_path is None or self._cover_sizes_exist(pk, custom):
+                    status.decrement_total()
+                    continue
+                yield pk, db_path
+
+    def _create_covers_serial(self, cover_db_paths, custom):
+        """Create covers in this thread, yielding results."""
+        for pk, db_path in cover_db_paths:
+            if self._shutdown_event.is_set():
+                break
+            yield (
+                pk,
+                db_path,
+                lambda db_path=db_path: self.create_cover_thumbnails(db_path, custom),
+            )
+
+    def _create_covers_pool(self, cover_db_paths, custom, num_workers):
+        """Create covers in a process pool, yielding results as they finish."""
+        max_in_flight = num_workers * _COVER_MAX_IN_FLIGHT_PER_WORKER
+        in_flight = {}
+        # Spawn, because forking the multithreaded librarian process is unsafe.
+        executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_cover_worker,
+            initargs=(self.log_queue,),
+        )
+        try:
+            while not self._shutdown_event.is_set():
+                for pk, db_path in islice(
+                    cover_db_paths, max_in_flight - len(in_flight)
+                ):
+                    future = executor.submit(
+                        CoverCreateThread.create_cover_thumbnails, db_path, custom
+                    )
+                    in_flight[future] = (pk, db_path)
+                if not in_flight:
+                    break
+                done, _ = wait(
+                    in_flight,
+                    timeout=_SHUTDOWN_POLL_TIMEOUT,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    pk, db_path = in_flight.pop(future)
+                    yield pk, db_path, future.result
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _save_created_cover(self, pk, db_path, custom, get_data):
+        """Save one created cover, or the missing marker if creation failed."""
+        try:
+            thumbnails = get_data()
+        except Exception as exc:
+            thumbnails = {}
+            self.log.warning(f"Could not create cover thumbnail for {db_path}: {exc}")
+        self._save_cover_thumbnails(pk, custom, thumbnails)
+
+    def reencode_cover(self, pk, custom):
+        """Replace fast profile covers with best profile covers."""
+        # Returns False only if the covers could not be re-encoded.
+        if not self._fast_covers_exist(pk, custom):
+            return True
+        if self._cover_sizes_exist(pk, custom):
+            thumbnails = None
+        else:
+            model = CustomCover if custom else Comic
+            db_path = model.objects.filter(pk=pk).values_list("path", flat=True).first()
+            if db_path is None:
+                thumbnails = None
+            else:
+                try:
+                    thumbnails = self.create_cover_thumbnails(db_path, custom)
+                except Exception as exc:
+                    # Keep serving the fast covers.
+                    self.log.debug(f"Could not re-encode cover for {db_path}: {exc}")
+                    return False
+        if thumbnails:
+            self._save_cover_thumbnails(pk, custom, thumbnails)
+        else:
+            self._remove_fast_covers(pk, custom)
+        return True
 
     def _bulk_create_comic_covers(self, pks, custom):
         """Create bulk comic covers."""
+        pks = tuple(pks)
         num_comics = len(pks)
         if not num_comics:
             return None
@@ -108,20 +415,16 @@ class CoverCreateThread(QueuedThread, CoverPathMixin):
             self.log.debug(f"Creating {num_comics} comic covers...")
             self.status_controller.start(status)
 
-            # Get comic objects
-            for pk in pks:
-                # Create all covers.
-                cover_path = self.get_cover_path(pk, custom)
-                if cover_path.exists():
-                    status.decrement_total()
-                else:
-                    # bulk contributor creates covers inline
-                    data = self.create_cover_from_path(
-                        pk, cover_path, self.log, self.librarian_queue, custom=False
-                    )
-                    if data:
-                        data.close()
-                    status.increment_complete()
+            cover_db_paths = self._get_missing_cover_db_paths(pks, custom, status)
+            num_workers = min(_COVER_MAX_WORKERS, num_comics)
+            if num_workers > 1 and num_comics >= _COVER_POOL_MIN_PKS:
+                self.log.debug(f"Creating covers with {num_workers} processes.")
+                results = self._create_covers_pool(cover_db_paths, custom, num_workers)
+            else:
+                results = self._create_covers_serial(cover_db_paths, custom)
+            for pk, db_path, get_data in results:
+                self._save_created_cover(pk, db_path, custom, get_data)
+                status.increment_complete()
                 self.status_controller.update(status)
 
             total_elapsed = naturaldelta(time() - start_time)
@@ -129,6 +432,8 @@ class CoverCreateThread(QueuedThread, CoverPathMixin):
             self.log.info(
                 f"Created {status.complete} {desc} covers in {total_elapsed}."
             )
+            if self._shutdown_event.is_set():
+                self.log.info("Stopped creating covers for shutdown.")
         finally:
             self.status_controller.finish(status)
         return status.complete
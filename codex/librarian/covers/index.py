@@ -0,0 +1,49 @@
+"""Small sqlite indexes kept beside the cover cache."""
+
+import sqlite3
+from contextlib import contextmanager
+from threading import Lock, local
+
+_TIMEOUT = 30.0
+
+
+class CoverIndex:
+    """A sqlite database with a connection per thread."""
+
+    SCHEMA: tuple[str, ...] = ()
+
+    def __init__(self, path):
+        """Set the path. Connect lazily."""
+        self._path = path
+        self._local = local()
+        self._write_lock = Lock()
+
+    @property
+    def _db(self):
+        """Get this thread's connection."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(
+                self._path,
+                timeout=_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                db.execute(statement)
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
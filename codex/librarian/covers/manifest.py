@@ -0,0 +1,132 @@
+"""Manifest of the covers in the cache and when they were made."""
+
+from time import time
+
+from codex.librarian.covers.index import CoverIndex
+from codex.settings.settings import FILTER_BATCH_SIZE, ROOT_CACHE_PATH
+
+# Rescan the whole cache this often in case the manifest missed a cover.
+_FULL_SCAN_INTERVAL = 30 * 24 * 60 * 60
+_MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS covers (
+    pk INTEGER NOT NULL,
+    custom INTEGER NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (pk, custom)
+) WITHOUT ROWID
+"""
+_DELETED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deleted (
+    pk INTEGER NOT NULL,
+    custom INTEGER NOT NULL,
+    PRIMARY KEY (pk, custom)
+) WITHOUT ROWID
+"""
+_SCANS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    custom INTEGER PRIMARY KEY,
+    scanned REAL NOT NULL
+)
+"""
+
+
+class CoverManifest(CoverIndex):
+    """Which pks have covers in the cache."""
+
+    SCHEMA = (_MANIFEST_SCHEMA, _DELETED_SCHEMA, _SCANS_SCHEMA)
+
+    def add(self, keys):
+        """Record covers made now for (pk, custom) keys."""
+        now = time()
+        with self._write_lock, self._transaction() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO covers VALUES (?, ?, ?)",
+                ((pk, custom, now) for pk, custom in keys),
+            )
+
+    def remove(self, pks, custom):
+        """Forget covers and that their pks were deleted."""
+        params = tuple((pk, custom) for pk in pks)
+        with self._write_lock, self._transaction() as db:
+            db.executemany("DELETE FROM covers WHERE pk = ? AND custom = ?", params)
+            db.executemany("DELETE FROM deleted WHERE pk = ? AND custom = ?", params)
+
+    def add_deleted(self, pks, custom):
+        """Record pks deleted from the database so their covers can be purged."""
+        with self._write_lock, self._transaction() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO deleted VALUES (?, ?)",
+                ((pk, custom) for pk in pks),
+            )
+
+    def get_deleted_pks(self, custom):
+        """Get the pks recorded as deleted."""
+        rows = self._db.execute("SELECT pk FROM deleted WHERE custom = ?", (custom,))
+        return frozenset(pk for (pk,) in rows)
+
+    def forget_deleted(self, pks, custom):
+        """Forget that pks were deleted."""
+        with self._write_lock, self._transaction() as db:
+            db.executemany(
+                "DELETE FROM deleted WHERE pk = ? AND custom = ?",
+                ((pk, custom) for pk in pks),
+            )
+
+    def clear(self):
+        """Forget every cover, deletion and scan."""
+        with self._write_lock, self._transaction() as db:
+            db.execute("DELETE FROM covers")
+            db.execute("DELETE FROM deleted")
+            db.execute("DELETE FROM scans")
+
+    def get_pks(self, custom):
+        """Get the pks with covers."""
+        rows = self._db.execute("SELECT pk FROM covers WHERE custom = ?", (custom,))
+        return frozenset(pk for (pk,) in rows)
+
+    def filter_pks(self, pks, custom):
+        """Get which of these pks have covers."""
+        pks = tuple(pks)
+        found_pks = set()
+        for start in range(0, len(pks), FILTER_BATCH_SIZE):
+            batch_pks = pks[start : start + FILTER_BATCH_SIZE]
+            rows = self._db.execute(
+                "SELECT pk FROM covers WHERE custom = ? "  # noqa: S608
+                f"AND pk IN ({', '.join('?' * len(batch_pks))})",
+                (custom, *batch_pks),
+            )
+            found_pks.update(pk for (pk,) in rows)
+        return frozenset(found_pks)
+
+    def replace(self, pks, custom):
+        """Replace the manifest with the covers found by a full scan."""
+        now = time()
+        with self._write_lock, self._transaction() as db:
+            known_pks = frozenset(
+                pk
+                for (pk,) in db.execute(
+                    "SELECT pk FROM covers WHERE custom = ?", (custom,)
+                )
+            )
+            db.executemany(
+                "DELETE FROM covers WHERE pk = ? AND custom = ?",
+                ((pk, custom) for pk in known_pks - pks),
+            )
+            # Creation times are unknown for covers the manifest missed.
+            db.executemany(
+                "INSERT INTO covers VALUES (?, ?, ?)",
+                ((pk, custom, now) for pk in pks - known_pks),
+            )
+            # A full scan finds every orphan, recorded deletions or not.
+            db.execute("DELETE FROM deleted WHERE custom = ?", (custom,))
+            db.execute("INSERT OR REPLACE INTO scans VALUES (?, ?)", (custom, now))
+
+    def needs_full_scan(self, custom):
+        """Return if the cache hasn't been fully scanned recently."""
+        row = self._db.execute(
+            "SELECT scanned FROM scans WHERE custom = ?", (custom,)
+        ).fetchone()
+        return row is None or time() - row[0] > _FULL_SCAN_INTERVAL
+
+
+COVER_MANIFEST = CoverManifest(ROOT_CACHE_PATH / "covers-manifest.sqlite3")
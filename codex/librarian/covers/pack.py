@@ -0,0 +1,289 @@
+"""Packed cover store of append only shard files and a byte range index."""
+
+import os
+from contextlib import suppress
+from io import SEEK_CUR, SEEK_END, SEEK_SET, RawIOBase
+
+from codex.librarian.covers.index import CoverIndex
+from codex.settings.settings import COVER_PACKS, ROOT_CACHE_PATH
+
+COVER_PACKS_ROOT = ROOT_CACHE_PATH / "cover-packs"
+# Start a new shard when the one being appended to grows past this.
+_SHARD_MAX_SIZE = 64 * 1024 * 1024
+_SHARD_SUFFIX = ".pack"
+# Compact shards when at least this fraction of their bytes is unindexed.
+_COMPACT_DEAD_RATIO = 0.25
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS covers (
+    pk INTEGER NOT NULL,
+    custom INTEGER NOT NULL,
+    variant TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (pk, custom, variant)
+) WITHOUT ROWID
+"""
+
+
+def _copy_range(src_fd, dst_fd, offset, length, dst_offset):
+    """Copy a byte range between files, in the kernel where possible."""
+    while length > 0:
+        if hasattr(os, "copy_file_range"):
+            copied = os.copy_file_range(src_fd, dst_fd, length, offset, dst_offset)
+        else:
+            copied = os.pwrite(dst_fd, os.pread(src_fd, length, offset), dst_offset)
+        if not copied:
+            reason = f"Shard ended {length} bytes before the cover."
+            raise OSError(reason)
+        offset += copied
+        dst_offset += copied
+        length -= copied
+
+
+class CoverPackRange(RawIOBase):
+    """A read only file of one cover's byte range in a shard."""
+
+    def __init__(self, shard_path, offset, length):
+        """Open the shard."""
+        super().__init__()
+        self._fd = os.open(shard_path, os.O_RDONLY)
+        self.offset = offset
+        self.length = length
+        self._pos = 0
+
+    def readable(self):
+        """Is readable."""
+        return True
+
+    def seekable(self):
+        """Is seekable."""
+        return True
+
+    def readinto(self, buffer):
+        """Read from the shard straight into the buffer."""
+        size = min(len(buffer), self.length - self._pos)
+        if size <= 0:
+            return 0
+        with memoryview(buffer) as view:
+            count = os.preadv(self._fd, (view[:size],), self.offset + self._pos)
+        self._pos += count
+        return count
+
+    def seek(self, pos, whence=SEEK_SET):
+        """Seek within the cover."""
+        if whence == SEEK_CUR:
+            pos += self._pos
+        elif whence == SEEK_END:
+            pos += self.length
+        self._pos = max(0, pos)
+        return self._pos
+
+    def tell(self):
+        """Position within the cover."""
+        return self._pos
+
+    def close(self):
+        """Close the shard."""
+        if not self.closed:
+            os.close(self._fd)
+        super().close()
+
+
+class CoverPack(CoverIndex):
+    """Append only cover shards with an index of where each cover is."""
+
+    SCHEMA = (_INDEX_SCHEMA,)
+
+    def __init__(self, root):
+        """Set paths. Connect and open shards lazily."""
+        super().__init__(root / "index.sqlite3")
+        self.root = root
+        self._shard = None
+        self._shard_fd = None
+        self._shard_size = 0
+
+    def _get_shard_path(self, shard):
+        return self.root / f"{shard:06d}{_SHARD_SUFFIX}"
+
+    def _get_shard_paths(self):
+        """Get every shard path by shard number."""
+        if not self.root.is_dir():
+            return {}
+        return {
+            int(path.stem): path
+            for path in self.root.iterdir()
+            if path.suffix == _SHARD_SUFFIX and path.stem.isdigit()
+        }
+
+    def _close_shard(self):
+        if self._shard_fd is not None:
+            os.close(self._shard_fd)
+        self._shard = None
+        self._shard_fd = None
+        self._shard_size = 0
+
+    def _open_shard(self, shard):
+        """Open a shard to append to."""
+        self._close_shard()
+        self.root.mkdir(parents=True, exist_ok=True)
+        shard_path = self._get_shard_path(shard)
+        self._shard_fd = os.open(shard_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        self._shard_size = os.lseek(self._shard_fd, 0, SEEK_END)
+        self._shard = shard
+
+    def _get_write_shard(self, length):
+        """Get the shard to append to, starting a new one if it's full."""
+        if self._shard_fd is None or self._shard_size + length > _SHARD_MAX_SIZE:
+            shard = self._shard or max(self._get_shard_paths(), default=0)
+            shard_path = self._get_shard_path(shard)
+            if not shard or shard_path.stat().st_size + length > _SHARD_MAX_SIZE:
+                shard += 1
+            self._open_shard(shard)
+        return self._shard, self._shard_fd
+
+    def _append(self, data):
+        """Append data to the active shard. Return its shard and offset."""
+        shard, shard_fd = self._get_write_shard(len(data))
+        offset = self._shard_size
+        with memoryview(data) as view:
+            written = 0
+            while written < len(view):
+                written += os.pwrite(shard_fd, view[written:], offset + written)
+        self._shard_size += written
+        return shard, offset
+
+    def put_many(self, covers):
+        """
+        Append covers to the shards and index them.
+
+        Empty data marks a missing cover but never replaces one.
+        """
+        with self._write_lock:
+            rows = []
+            marker_rows = []
+            for pk, custom, variant, data in covers:
+                if data:
+                    shard, offset = self._append(data)
+                    rows.append((pk, custom, variant, shard, offset, len(data)))
+                else:
+                    marker_rows.append((pk, custom, variant, 0, 0, 0))
+            # Index only after the data is in the shard so readers never see
+            # a range that isn't written yet.
+            with self._transaction() as db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO covers VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                db.executemany(
+                    "INSERT OR IGNORE INTO covers VALUES (?, ?, ?, ?, ?, ?)",
+                    marker_rows,
+                )
+
+    def get(self, pk, custom, variant):
+        """Get the shard, offset and length of a cover or None."""
+        return self._db.execute(
+            "SELECT shard, offset, length FROM covers "
+            "WHERE pk = ? AND custom = ? AND variant = ?",
+            (pk, custom, variant),
+        ).fetchone()
+
+    def open(self, pk, custom, variant):
+        """Open a cover as a file of its byte range or return None."""
+        # Compaction may move the cover between the lookup and the open.
+        for _ in range(2):
+            entry = self.get(pk, custom, variant)
+            if entry is None:
+                return None
+            shard, offset, length = entry
+            with suppress(FileNotFoundError):
+                return CoverPackRange(self._get_shard_path(shard), offset, length)
+        return None
+
+    def get_pks(self, custom):
+        """Get the pks of every indexed cover."""
+        rows = self._db.execute(
+            "SELECT DISTINCT pk FROM covers WHERE custom = ?", (custom,)
+        )
+        return frozenset(pk for (pk,) in rows)
+
+    def remove(self, pks, custom, variants=None):
+        """Unindex covers, leaving their bytes for compaction. Return the count."""
+        sql = "DELETE FROM covers WHERE pk = ? AND custom = ?"
+        params = [custom]
+        if variants:
+            sql += f" AND variant IN ({', '.join('?' * len(variants))})"
+            params += list(variants)
+        with self._write_lock, self._transaction() as db:
+            cursor = db.executemany(sql, ((pk, *params) for pk in pks))
+            return cursor.rowcount
+
+    def remove_all(self):
+        """Unindex every cover and remove every shard."""
+        # The index is emptied, not removed, to keep other processes'
+        # connections valid.
+        with self._write_lock:
+            with self._transaction() as db:
+                db.execute("DELETE FROM covers")
+            self._close_shard()
+            for shard_path in self._get_shard_paths().values():
+                shard_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _get_dead_shards(shard_paths, live_sizes):
+        """Get shards worth compacting and their unindexed bytes."""
+        dead_shards = []
+        for shard, shard_path in shard_paths.items():
+            size = shard_path.stat().st_size
+            live_size = live_sizes.get(shard, 0)
+            if not live_size or (size - live_size) / size >= _COMPACT_DEAD_RATIO:
+                dead_shards.append((shard, shard_path, size - live_size))
+        return dead_shards
+
+    def _compact_shard(self, shard, shard_path):
+        """Copy a shard's indexed covers to the active shard and remove it."""
+        rows = self._db.execute(
+            "SELECT pk, custom, variant, offset, length FROM covers "
+            "WHERE shard = ? AND length > 0",
+            (shard,),
+        ).fetchall()
+        moved = []
+        src_fd = os.open(shard_path, os.O_RDONLY)
+        try:
+            for pk, custom, variant, offset, length in rows:
+                dst_shard, dst_fd = self._get_write_shard(length)
+                dst_offset = self._shard_size
+                _copy_range(src_fd, dst_fd, offset, length, dst_offset)
+                self._shard_size += length
+                moved.append((dst_shard, dst_offset, pk, custom, variant, shard))
+        finally:
+            os.close(src_fd)
+        with self._transaction() as db:
+            db.executemany(
+                "UPDATE covers SET shard = ?, offset = ? "
+                "WHERE pk = ? AND custom = ? AND variant = ? AND shard = ?",
+                moved,
+            )
+        shard_path.unlink(missing_ok=True)
+
+    def compact(self):
+        """Rewrite shards with many unindexed bytes. Return the bytes freed."""
+        with self._write_lock:
+            live_sizes = dict(
+                self._db.execute(
+                    "SELECT shard, SUM(length) FROM covers GROUP BY shard"
+                ).fetchall()
+            )
+            shard_paths = self._get_shard_paths()
+            dead_shards = self._get_dead_shards(shard_paths, live_sizes)
+            if not dead_shards:
+                return 0
+            # Append to a new shard so the current one can be compacted too.
+            self._open_shard(max(shard_paths) + 1)
+            freed = 0
+            for shard, shard_path, dead_size in dead_shards:
+                self._compact_shard(shard, shard_path)
+                freed += dead_size
+            return freed
+
+
+COVER_PACK = CoverPack(COVER_PACKS_ROOT) if COVER_PACKS else None
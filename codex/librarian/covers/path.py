@@ -1,11 +1,28 @@
 """Cover Path functions."""
 
+import os
 from pathlib import Path
+from types import MappingProxyType
 
 from fnvhash import fnv1a_32
 
+from codex.librarian.covers.pack import COVER_PACK
 from codex.settings.settings import ROOT_CACHE_PATH
 
+# Encoding profiles. Best keeps the original suffix so existing caches stay valid.
+COVER_PROFILE_BEST = "best"
+COVER_PROFILE_FAST = "fast"
+COVER_PROFILE_SUFFIXES = MappingProxyType(
+    {COVER_PROFILE_BEST: ".webp", COVER_PROFILE_FAST: ".fast.webp"}
+)
+# Size variants, largest first. 1x keeps the original suffix.
+COVER_SIZE_2X = "2x"
+COVER_SIZE_1X = "1x"
+COVER_SIZE_TINY = "tiny"
+COVER_SIZE_SUFFIXES = MappingProxyType(
+    {COVER_SIZE_2X: ".2x", COVER_SIZE_1X: "", COVER_SIZE_TINY: ".tiny"}
+)
+
 
 class CoverPathMixin:
     """Path methods for covers."""
@@ -28,17 +45,55 @@ class CoverPathMixin:
         return Path("/".join(parts))
 
     @classmethod
-    def get_cover_path(cls, pk, custom):
+    def get_cover_path(cls, pk, custom, profile=COVER_PROFILE_BEST, size=COVER_SIZE_1X):
         """Get cover path for comic pk."""
         cover_path = cls._hex_path(pk)
         root = cls.CUSTOM_COVERS_ROOT if custom else cls.COVERS_ROOT
-        return root / cover_path.with_suffix(".webp")
+        suffix = COVER_SIZE_SUFFIXES[size] + COVER_PROFILE_SUFFIXES[profile]
+        return root / cover_path.with_suffix(suffix)
+
+    @classmethod
+    def get_cover_size_paths(cls, pk, custom, profile=COVER_PROFILE_BEST):
+        """Get the cover path for every size variant."""
+        return {
+            size: cls.get_cover_path(pk, custom, profile, size)
+            for size in COVER_SIZE_SUFFIXES
+        }
 
     @classmethod
     def get_cover_paths(cls, pks, custom):
-        """Get cover paths for many comic pks."""
+        """Get cover paths for every profile and size for many comic pks."""
         cover_paths = set()
         for pk in pks:
-            cover_path = cls.get_cover_path(pk, custom)
-            cover_paths.add(cover_path)
+            for profile in COVER_PROFILE_SUFFIXES:
+                size_paths = cls.get_cover_size_paths(pk, custom, profile)
+                cover_paths.update(size_paths.values())
         return cover_paths
+
+    @staticmethod
+    def get_cover_variant(profile, size):
+        """Get the packed store key for a profile and size."""
+        return f"{size}.{profile}"
+
+    @classmethod
+    def cover_exists(cls, pk, custom, profile=COVER_PROFILE_BEST, size=COVER_SIZE_1X):
+        """Return if a cover is in the cache."""
+        if COVER_PACK:
+            variant = cls.get_cover_variant(profile, size)
+            return COVER_PACK.get(pk, custom, variant) is not None
+        return cls.get_cover_path(pk, custom, profile, size).exists()
+
+    @classmethod
+    def open_cover(cls, pk, custom, profile=COVER_PROFILE_BEST, size=COVER_SIZE_1X):
+        """Open a cached cover and get its length, or None if it's not cached."""
+        if COVER_PACK:
+            variant = cls.get_cover_variant(profile, size)
+            if cover_file := COVER_PACK.open(pk, custom, variant):
+                return cover_file, cover_file.length
+            return None
+        cover_path = cls.get_cover_path(pk, custom, profile, size)
+        try:
+            cover_file = cover_path.open("rb")
+        except FileNotFoundError:
+            return None
+        return cover_file, os.fstat(cover_file.fileno()).st_size
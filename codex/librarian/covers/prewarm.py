@@ -0,0 +1,157 @@
+"""Create the covers users ask for first before they ask."""
+
+from itertools import chain, islice
+from time import time
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from codex.librarian.covers.manifest import COVER_MANIFEST
+from codex.librarian.covers.purge import CoverPurgeThread
+from codex.librarian.covers.status import CoverStatusTypes
+from codex.models import Comic, Library, Publisher
+from codex.models.paths import CustomCover
+from codex.status import Status
+
+# The first page of browser and OPDS groups.
+_LANDING_PAGE_SIZE = 100
+# How the default browser settings order a publisher's comics.
+_PUBLISHER_COMIC_ORDER = (
+    "imprint__sort_name",
+    "series__sort_name",
+    "volume__name",
+    "issue_number",
+    "issue_suffix",
+    "sort_name",
+    "pk",
+)
+_NEWEST_COMIC_ORDER = ("-created_at", "-pk")
+
+
+class CoverPrewarmThread(CoverPurgeThread):
+    """Create covers for new comics and landing pages while idle."""
+
+    # Let imports settle and on demand covers go first.
+    PREWARM_IDLE_DELAY = 10.0
+    # Throttle between batches so on demand covers stay responsive.
+    PREWARM_BATCH_DELAY = 1.0
+    PREWARM_BATCH_SIZE = 8
+
+    def __init__(self, *args, **kwargs):
+        """Initialize pre-warm state."""
+        super().__init__(*args, **kwargs)
+        # Ordered set of (pk, custom) keys.
+        self._prewarm_keys = {}
+        self._prewarm_status = None
+        self._next_prewarm_time = 0.0
+
+    @staticmethod
+    def _get_first_comic_keys(group_rel, order_by, group_pks=None, limit=None):
+        """Get the cover key of each group's first comic in one windowed query."""
+        qs = Comic.objects.all()
+        if group_pks is not None:
+            qs = qs.filter(**{f"{group_rel}__in": group_pks})
+        rank = Window(RowNumber(), partition_by=F(group_rel), order_by=order_by)
+        qs = qs.annotate(cover_rank=rank).filter(cover_rank=1)
+        rows = qs.order_by(*_NEWEST_COMIC_ORDER).values_list(
+            "pk", f"{group_rel}__custom_cover"
+        )
+        if limit:
+            rows = rows[:limit]
+        # Custom covers are on by default.
+        return [
+            (custom_cover_pk, True) if custom_cover_pk else (pk, False)
+            for pk, custom_cover_pk in rows
+        ]
+
+    @classmethod
+    def _get_new_cover_keys(cls, since):
+        """Get the cover keys of custom covers and comics created since."""
+        custom_keys = (
+            (pk, True)
+            for pk in CustomCover.objects.filter(created_at__gte=since)
+            .order_by(*_NEWEST_COMIC_ORDER)
+            .values_list("pk", flat=True)
+        )
+        comic_keys = (
+            (pk, False)
+            for pk in Comic.objects.filter(created_at__gte=since)
+            .order_by(*_NEWEST_COMIC_ORDER)
+            .values_list("pk", flat=True)
+        )
+        return chain(custom_keys, comic_keys)
+
+    @classmethod
+    def _get_landing_cover_keys(cls):
+        """Get the cover keys of the top publishers and recently added series."""
+        publisher_pks = Publisher.objects.order_by("sort_name", "pk").values_list(
+            "pk", flat=True
+        )[:_LANDING_PAGE_SIZE]
+        publisher_keys = cls._get_first_comic_keys(
+            "publisher", _PUBLISHER_COMIC_ORDER, group_pks=publisher_pks
+        )
+        series_keys = cls._get_first_comic_keys(
+            "series", _NEWEST_COMIC_ORDER, limit=_LANDING_PAGE_SIZE
+        )
+        return chain(publisher_keys, series_keys)
+
+    def add_prewarm_task(self, task):
+        """Schedule covers for new comics ahead of landing page covers."""
+        new_keys = self._get_new_cover_keys(task.since) if task.since else ()
+        landing_keys = self._get_landing_cover_keys()
+        keys = dict.fromkeys(chain(new_keys, self._prewarm_keys, landing_keys))
+        cached_pks = {
+            custom: COVER_MANIFEST.filter_pks(
+                (pk for pk, key_custom in keys if key_custom == custom), custom
+            )
+            for custom in (False, True)
+        }
+        keys = dict.fromkeys(key for key in keys if key[0] not in cached_pks[key[1]])
+        added = len(keys) - len(self._prewarm_keys)
+        self._prewarm_keys = keys
+        if not keys:
+            return
+        if self._prewarm_status:
+            self._prewarm_status.total += added
+        else:
+            self._prewarm_status = Status(CoverStatusTypes.PREWARM_COVERS, 0, len(keys))
+            self.status_controller.start(self._prewarm_status)
+        self._next_prewarm_time = time() + self.PREWARM_IDLE_DELAY
+        self.log.debug(f"Scheduled {len(keys)} covers to pre-warm.")
+
+    def get_prewarm_timeout(self):
+        """Get the time until the next pre-warm batch, if there is one."""
+        if not self._prewarm_keys:
+            return None
+        return max(0.0, self._next_prewarm_time - time())
+
+    def _create_prewarm_covers(self, keys, status):
+        """Create a batch of covers, reporting progress."""
+        for custom in (False, True):
+            pks = tuple(pk for pk, key_custom in keys if key_custom == custom)
+            cover_db_paths = self._get_missing_cover_db_paths(pks, custom, status)
+            for pk, db_path, get_data in self._create_covers_serial(
+                cover_db_paths, custom
+            ):
+                self._save_created_cover(pk, db_path, custom, get_data)
+                status.increment_complete()
+        self.status_controller.update(status)
+
+    def prewarm_covers(self):
+        """Create one throttled batch of pre-warm covers."""
+        if time() < self._next_prewarm_time:
+            return
+        if Library.objects.filter(update_in_progress=True).exists():
+            self._next_prewarm_time = time() + self.PREWARM_IDLE_DELAY
+            return
+        self._next_prewarm_time = time() + self.PREWARM_BATCH_DELAY
+        keys = tuple(islice(self._prewarm_keys, self.PREWARM_BATCH_SIZE))
+        for key in keys:
+            del self._prewarm_keys[key]
+        status = self._prewarm_status
+        self._create_prewarm_covers(keys, status)
+        if not self._prewarm_keys or self._shutdown_event.is_set():
+            self._prewarm_keys.clear()
+            self._prewarm_status = None
+            self.status_controller.finish(status)
+            self.log.info(f"Pre-warmed {status.complete} covers.")
@@ -2,13 +2,20 @@
 
 import os
 import shutil
+from itertools import islice
 from pathlib import Path
 
+from humanize import naturalsize
+
 from codex.librarian.covers.create import CoverCreateThread
+from codex.librarian.covers.manifest import COVER_MANIFEST
+from codex.librarian.covers.pack import COVER_PACK
+from codex.librarian.covers.path import COVER_PROFILE_SUFFIXES, COVER_SIZE_SUFFIXES
 from codex.librarian.covers.status import CoverStatusTypes
 from codex.librarian.notifier.tasks import COVERS_CHANGED_TASK
 from codex.models import Comic
 from codex.models.paths import CustomCover
+from codex.settings.settings import FILTER_BATCH_SIZE
 from codex.status import Status
 
 
@@ -53,16 +60,37 @@ class CoverPurgeThread(CoverCreateThread):
             self.status_controller.finish(status)
         return status.complete
 
+    def _purge_packed_covers(self, pks, custom):
+        """Unindex packed covers."""
+        self.log.debug(f"Removing {len(pks)} possible packed cover thumbnails...")
+        status = Status(CoverStatusTypes.PURGE_COVERS, None, len(pks))
+        try:
+            self.status_controller.start(status)
+            count = COVER_PACK.remove(pks, custom)
+            self.log.info(f"Removed {count} packed cover thumbnails.")
+        finally:
+            self.status_controller.finish(status)
+        return count
+
     def purge_comic_covers(self, pks: frozenset[int], custom: bool):
         """Purge a set a cover paths."""
-        cover_paths = self.get_cover_paths(pks, custom)
-        cover_root = self.CUSTOM_COVERS_ROOT if custom else self.COVERS_ROOT
-        return self.purge_cover_paths(cover_paths, cover_root)
+        if COVER_PACK:
+            count = self._purge_packed_covers(pks, custom)
+        else:
+            cover_paths = self.get_cover_paths(pks, custom)
+            cover_root = self.CUSTOM_COVERS_ROOT if custom else self.COVERS_ROOT
+            count = self.purge_cover_paths(cover_paths, cover_root)
+        COVER_MANIFEST.remove(pks, custom)
+        return count
 
     def purge_all_comic_covers(self, librarian_queue):
         """Purge every comic cover."""
         self.log.debug("Removing entire comic cover cache.")
+        COVER_MANIFEST.clear()
         try:
+            if COVER_PACK:
+                COVER_PACK.remove_all()
+                self.log.info("Removed entire packed cover cache.")
             shutil.rmtree(self.COVERS_ROOT)
             self.log.info("Removed entire comic cover cache.")
             shutil.rmtree(self.CUSTOM_COVERS_ROOT)
@@ -71,31 +99,130 @@ class CoverPurgeThread(CoverCreateThread):
             self.log.warning(exc)
         librarian_queue.put(COVERS_CHANGED_TASK)
 
-    def _cleanup_orphan_covers(self, cover_class, cover_root, name):
+    def _scan_cover_tree(self, db_pks, custom):
+        """Walk a cover tree for orphans and rebuild the manifest from it."""
+        cover_root = self.CUSTOM_COVERS_ROOT if custom else self.COVERS_ROOT
+        db_cover_path_pks = {
+            cover_path: pk
+            for pk in db_pks
+            for cover_path in self.get_cover_paths((pk,), custom)
+        }
+        cover_pks = set()
+        orphan_cover_paths = set()
+        for root, _, filenames in os.walk(cover_root):
+            root_path = Path(root)
+            for fn in filenames:
+                fs_cover_path = root_path / fn
+                pk = db_cover_path_pks.get(fs_cover_path)
+                if pk is None:
+                    orphan_cover_paths.add(fs_cover_path)
+                else:
+                    cover_pks.add(pk)
+        COVER_MANIFEST.replace(cover_pks, custom)
+        return orphan_cover_paths
+
+    def _get_deleted_orphan_pks(self, cover_class, custom):
+        """Get covers for pks recorded as deleted that are gone from the db."""
+        deleted_pks = COVER_MANIFEST.get_deleted_pks(custom)
+        extant_pks = set()
+        batch_pks = tuple(deleted_pks)
+        for start in range(0, len(batch_pks), FILTER_BATCH_SIZE):
+            extant_pks.update(
+                cover_class.objects.filter(
+                    pk__in=batch_pks[start : start + FILTER_BATCH_SIZE]
+                ).values_list("pk", flat=True)
+            )
+        orphan_pks = COVER_MANIFEST.filter_pks(deleted_pks - extant_pks, custom)
+        # Purging forgets the orphans, forget the rest now.
+        COVER_MANIFEST.forget_deleted(deleted_pks - orphan_pks, custom)
+        return orphan_pks
+
+    def _get_full_scan_orphans(self, cover_class, custom):
+        """Get orphans by comparing every pk in the db with every cover."""
+        db_pks = frozenset(cover_class.objects.values_list("pk", flat=True))
+        if not COVER_PACK:
+            return frozenset(), self._scan_cover_tree(db_pks, custom)
+        COVER_MANIFEST.replace(COVER_PACK.get_pks(custom), custom)
+        return COVER_MANIFEST.get_pks(custom) - db_pks, set()
+
+    def _cleanup_orphan_covers(self, cover_class, custom, name):
         """Remove all orphan cover thumbs."""
+        # Deleted pks are recorded so finding orphans only checks those. A
+        # rare full scan catches covers for deletions that weren't recorded.
+        full_scan = COVER_MANIFEST.needs_full_scan(custom)
+        orphan_pks = frozenset()
+        orphan_cover_paths = set()
         try:
-            self.log.debug(f"Removing covers from missing {name}.")
+            scan_desc = "scanning every cover" if full_scan else "from deletions"
+            self.log.debug(f"Removing covers from missing {name}, {scan_desc}.")
             self.status_controller.start_many(self._CLEANUP_STATUS_MAP)
-            pks = cover_class.objects.all().values_list("pk", flat=True)
-            db_cover_paths = self.get_cover_paths(pks, custom=False)
-
-            orphan_cover_paths = set()
-            for root, _, filenames in os.walk(cover_root):
-                root_path = Path(root)
-                for fn in filenames:
-                    fs_cover_path = root_path / fn
-                    if fs_cover_path not in db_cover_paths:
-                        orphan_cover_paths.add(fs_cover_path)
+            if full_scan:
+                orphan_pks, orphan_cover_paths = self._get_full_scan_orphans(
+                    cover_class, custom
+                )
+            else:
+                orphan_pks = self._get_deleted_orphan_pks(cover_class, custom)
         finally:
             self.status_controller.finish(CoverStatusTypes.FIND_ORPHAN)
 
-        count = self.purge_cover_paths(orphan_cover_paths, cover_root)
+        if orphan_cover_paths:
+            cover_root = self.CUSTOM_COVERS_ROOT if custom else self.COVERS_ROOT
+            count = self.purge_cover_paths(orphan_cover_paths, cover_root)
+        elif orphan_pks:
+            count = self.purge_comic_covers(orphan_pks, custom)
+        else:
+            count = 0
+            self.status_controller.finish(CoverStatusTypes.PURGE_COVERS)
         self.log.info(f"Removed {count} covers for missing {name}.")
         return count
 
     def cleanup_orphan_covers(self):
         """Cleanup both comic and custom covers."""
-        self._cleanup_orphan_covers(Comic, self.COVERS_ROOT, "comics")
-        self._cleanup_orphan_covers(
-            CustomCover, self.CUSTOM_COVERS_ROOT, "custom covers"
-        )
+        self._cleanup_orphan_covers(Comic, custom=False, name="comics")
+        self._cleanup_orphan_covers(CustomCover, custom=True, name="custom covers")
+        self.compact_cover_packs()
+
+    def _migrate_cover_tree(self, cover_class, custom, cover_root):
+        """Move one cover tree's covers into the packed store."""
+        count = 0
+        pks = cover_class.objects.values_list("pk", flat=True).iterator()
+        while batch_pks := tuple(islice(pks, FILTER_BATCH_SIZE)):
+            covers = []
+            for pk in batch_pks:
+                for profile in COVER_PROFILE_SUFFIXES:
+                    for size in COVER_SIZE_SUFFIXES:
+                        cover_path = self.get_cover_path(pk, custom, profile, size)
+                        try:
+                            data = cover_path.read_bytes()
+                        except FileNotFoundError:
+                            continue
+                        variant = self.get_cover_variant(profile, size)
+                        covers.append((pk, custom, variant, data))
+            COVER_PACK.put_many(covers)
+            count += len(covers)
+        # Whatever is left belongs to missing comics.
+        shutil.rmtree(cover_root, ignore_errors=True)
+        return count
+
+    def migrate_covers_to_pack(self):
+        """Move covers from the file trees into the packed store."""
+        if not COVER_PACK:
+            self.log.warning("Packed covers are not enabled, not migrating covers.")
+            return
+        for cover_class, custom, cover_root in (
+            (Comic, False, self.COVERS_ROOT),
+            (CustomCover, True, self.CUSTOM_COVERS_ROOT),
+        ):
+            if not cover_root.is_dir():
+                continue
+            self.log.debug(f"Moving covers from {cover_root} into packs...")
+            count = self._migrate_cover_tree(cover_class, custom, cover_root)
+            self.log.info(f"Moved {count} covers from {cover_root} into packs.")
+
+    def compact_cover_packs(self):
+        """Reclaim space from removed covers in the packed store."""
+        if not COVER_PACK:
+            return
+        freed = COVER_PACK.compact()
+        if freed:
+            self.log.info(f"Compacted cover packs, freeing {naturalsize(freed)}.")
@@ -0,0 +1,71 @@
+"""Share on demand cover creation between concurrent requests."""
+
+from collections import OrderedDict
+from threading import Event, Lock
+from time import monotonic
+
+# Keep created covers until the cover thread has likely saved them.
+_RECENT_TTL = 10.0
+_RECENT_MAX_SIZE = 128
+
+
+class _Flight:
+    """One creation in progress."""
+
+    __slots__ = ("done", "result")
+
+    def __init__(self):
+        """Initialize the event."""
+        self.done = Event()
+        self.result = None
+
+
+class CoverSingleFlight:
+    """Run one creation per cover at a time and share the result."""
+
+    def __init__(self):
+        """Initialize the flights and recent results."""
+        self._lock = Lock()
+        self._flights = {}
+        self._recent = OrderedDict()
+
+    def _get_recent(self, key, now):
+        """Get a result created moments ago, dropping expired ones."""
+        while self._recent:
+            oldest_key, (expires, _) = next(iter(self._recent.items()))
+            if expires > now:
+                break
+            del self._recent[oldest_key]
+        recent = self._recent.get(key)
+        return recent[1] if recent else None
+
+    def _add_recent(self, key, result):
+        self._recent[key] = (monotonic() + _RECENT_TTL, result)
+        self._recent.move_to_end(key)
+        while len(self._recent) > _RECENT_MAX_SIZE:
+            self._recent.popitem(last=False)
+
+    def do(self, key, func):
+        """
+        Call func once for all concurrent callers with the same key.
+
+        Return the result and whether this caller created it.
+        """
+        with self._lock:
+            if (result := self._get_recent(key, monotonic())) is not None:
+                return result, False
+            flight = self._flights.get(key)
+            if created := flight is None:
+                flight = self._flights[key] = _Flight()
+        if not created:
+            flight.done.wait()
+            return flight.result, False
+        try:
+            flight.result = func()
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.result is not None:
+                    self._add_recent(key, flight.result)
+            flight.done.set()
+        return flight.result, True
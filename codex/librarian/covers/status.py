@@ -9,3 +9,4 @@ class CoverStatusTypes(TextChoices):
     CREATE_COVERS = "CCC"
     PURGE_COVERS = "CCD"
     FIND_ORPHAN = "CFO"
+    PREWARM_COVERS = "CCP"
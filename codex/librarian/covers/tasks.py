@@ -1,6 +1,7 @@
 """Covers Tasks."""
 
 from dataclasses import dataclass
+from datetime import datetime
 
 
 @dataclass
@@ -30,10 +31,38 @@ class CoverRemoveTask(CoverTask):
 class CoverSaveToCache(CoverTask):
     """Write cover to disk."""
 
-    cover_path: str
+    pk: int
+    custom: bool
+    profile: str
+    size: str
     data: bytes
 
 
+@dataclass
+class CoverReencodeTask(CoverTask):
+    """Re-encode a fast profile cover with the best profile when idle."""
+
+    pk: int
+    custom: bool
+
+
 @dataclass
 class CoverCreateAllTask(CoverTask):
     """A create all comic covers."""
+
+
+@dataclass
+class CoverPrewarmTask(CoverTask):
+    """Create covers for comics created since and landing pages when idle."""
+
+    since: datetime | None = None
+
+
+@dataclass
+class CoverPackMigrateTask(CoverTask):
+    """Move covers from the file tree into the packed store."""
+
+
+@dataclass
+class CoverPackCompactTask(CoverTask):
+    """Reclaim space from removed covers in the packed store."""
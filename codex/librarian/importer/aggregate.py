@@ -8,6 +8,7 @@ from codex.librarian.importer.const import (
     COMIC_M2M_FIELD_NAMES,
     COMIC_PATHS,
     COUNT_FIELDS,
+    COVER_THUMBNAILS,
     DICT_MODEL_AGG_MAP,
     FIS,
     FKS,
@@ -22,6 +23,7 @@ from codex.librarian.importer.extract import ExtractMetadataImporter
 from codex.librarian.importer.status import ImportStatusTypes
 from codex.models import Imprint, Publisher, Series, Volume
 from codex.models.admin import AdminFlag
+from codex.settings.settings import IMPORT_COVERS
 from codex.status import Status
 from codex.util import max_none
 
@@ -215,8 +217,11 @@ class AggregateMetadataImporter(ExtractMetadataImporter):
         self.log.info(
             f"Reading tags from {total_paths} comics in {self.library.path}..."
         )
-        status = Status(ImportStatusTypes.AGGREGATE_TAGS, 0, total_paths)
-        self.status_controller.start(status, notify=False)
+        own_status = status is None
+        if own_status:
+            status = Status(ImportStatusTypes.AGGREGATE_TAGS, 0, total_paths)
+            self.status_controller.start(status, notify=False)
+        start_complete = status.complete or 0
 
         # Set import_metadata flag
         if self.task.force_import_metadata:
@@ -226,14 +231,22 @@ class AggregateMetadataImporter(ExtractMetadataImporter):
             import_metadata = AdminFlag.objects.get(key=key).on
         if not import_metadata:
             self.log.warning("Admin flag set to NOT import metadata.")
+        stat_only_paths = (
+            self.task.files_created if self.stat_only_ingest else frozenset()
+        )
 
         # Init metadata, extract and aggregate
         self.metadata[MDS] = {}
         self.metadata[M2M_MDS] = {}
         self.metadata[FKS] = {GROUP_TREES: {cls: {} for cls in self._BROWSER_GROUPS}}
-        self.metadata[FIS] = {}
-        for path in all_paths:
-            md = self.extract_and_clean(path, import_metadata)
+        self.metadata[COVER_THUMBNAILS] = {}
+        # Failed imports accumulate across import chunks.
+        self.metadata.setdefault(FIS, {})
+        for path, md in self.extract_and_clean_many(
+            all_paths, import_metadata, stat_only_paths, import_covers=IMPORT_COVERS
+        ):
+            if cover_thumbnail := md.pop(COVER_THUMBNAILS, None):
+                self.metadata[COVER_THUMBNAILS][path] = cover_thumbnail
             if md:
                 self._aggregate_path(md, path, status)
 
@@ -249,8 +262,9 @@ class AggregateMetadataImporter(ExtractMetadataImporter):
             fi_status,
             notify=False,
         )
-        count = status.complete if status else 0
+        count = (status.complete or 0) - start_complete
         self.log.info(f"Aggregated tags from {count} comics.")
 
-        self.status_controller.finish(status)
+        if own_status:
+            self.status_controller.finish(status)
         return count
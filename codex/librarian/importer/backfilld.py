@@ -0,0 +1,131 @@
+"""Backfill page counts and metadata for comics ingested stat only."""
+
+from time import time
+
+from comicbox.box import Comicbox
+from django.db.models import Exists, OuterRef
+
+from codex.librarian.importer.tasks import BackfillComicsTask, LazyImportComicsTask
+from codex.librarian.notifier.tasks import LIBRARY_CHANGED_TASK
+from codex.models import Comic, FailedImport, Library
+from codex.models.admin import AdminFlag
+from codex.settings.settings import STAT_ONLY_INGEST_THRESHOLD
+from codex.threads import QueuedThread
+
+
+class ComicBackfillThread(QueuedThread):
+    """Slowly fill in what a stat only ingest skipped while the importer idles."""
+
+    # Let imports settle before competing for disk and the database.
+    IDLE_DELAY = 10.0
+    # Throttle between batches so the server stays responsive.
+    BATCH_DELAY = 2.0
+    PAGE_COUNT_BATCH_SIZE = 100
+    METADATA_BATCH_SIZE = 100
+
+    def __init__(self, *args, **kwargs):
+        """Initialize work state."""
+        super().__init__(*args, **kwargs)
+        # Only stat only ingests leave work from a previous run to check for.
+        self._check_db = bool(STAT_ONLY_INGEST_THRESHOLD)
+        self._metadata_pks = set()
+        # Unreadable comics sent to the importer to become failed imports.
+        self._failing_pks = set()
+        self._page_counts_changed = False
+        self._next_batch_time = time() + self.IDLE_DELAY
+
+    def get_timeout(self):
+        """Wake up only while there is work to do."""
+        if not self._check_db and not self._metadata_pks:
+            return None
+        return max(0.0, self._next_batch_time - time())
+
+    def _is_importer_busy(self):
+        """Never compete with a running import."""
+        return Library.objects.filter(update_in_progress=True).exists()
+
+    def _backfill_page_counts(self):
+        """Open a batch of comics for their page counts and file types."""
+        # Returns the number of comics tried, failures included.
+        failed_imports = FailedImport.objects.filter(
+            library_id=OuterRef("library_id"), path=OuterRef("path")
+        )
+        comics = (
+            Comic.objects.filter(file_type="")
+            .exclude(Exists(failed_imports))
+            .exclude(pk__in=self._failing_pks)
+            .only("library_id", "path", "page_count", "file_type")
+            .order_by("pk")[: self.PAGE_COUNT_BATCH_SIZE]
+        )
+        update_comics = []
+        failing_pks = set()
+        count = 0
+        for comic in comics:
+            count += 1
+            try:
+                with Comicbox(comic.path) as cb:
+                    comic.file_type = cb.get_file_type() or ""
+                    comic.page_count = cb.get_page_count() or 0
+            except Exception as exc:
+                self.log.warning(f"Backfill could not read {comic.path}: {exc}")
+                failing_pks.add(comic.pk)
+                continue
+            if not comic.file_type:
+                self.log.warning(f"Backfill found no comic file type for {comic.path}")
+                failing_pks.add(comic.pk)
+                continue
+            update_comics.append(comic)
+
+        self._fail_comics(failing_pks)
+        if not update_comics:
+            return count
+        Comic.objects.bulk_update(update_comics, ("page_count", "file_type"))
+        self._metadata_pks.update(comic.pk for comic in update_comics)
+        self.log.debug(f"Backfilled page counts for {len(update_comics)} comics.")
+        return count
+
+    def _fail_comics(self, pks):
+        """Let the importer record unreadable comics as failed imports."""
+        if not pks:
+            return
+        self._failing_pks |= pks
+        # A full import of an unreadable comic fails and records why.
+        self.librarian_queue.put(LazyImportComicsTask(pks=frozenset(pks)))
+        self.log.debug(f"Queued {len(pks)} unreadable comics for failed imports.")
+
+    def _backfill_metadata(self):
+        """Send a batch of comics to the importer for full metadata."""
+        key = AdminFlag.FlagChoices.IMPORT_METADATA.value
+        if not AdminFlag.objects.get(key=key).on:
+            self._metadata_pks.clear()
+            return
+        pks = frozenset(sorted(self._metadata_pks)[: self.METADATA_BATCH_SIZE])
+        self._metadata_pks -= pks
+        self.librarian_queue.put(LazyImportComicsTask(pks=pks))
+        self.log.debug(f"Queued {len(pks)} comics for metadata backfill.")
+
+    def timed_out(self):
+        """Process one throttled batch."""
+        if self._is_importer_busy():
+            self._next_batch_time = time() + self.IDLE_DELAY
+            return
+        self._next_batch_time = time() + self.BATCH_DELAY
+        if self._check_db:
+            # Page counts first so every new comic is readable soon.
+            if self._backfill_page_counts():
+                self._page_counts_changed = True
+                return
+            self._check_db = False
+            if self._page_counts_changed:
+                self._page_counts_changed = False
+                self.librarian_queue.put(LIBRARY_CHANGED_TASK)
+        if self._metadata_pks:
+            self._backfill_metadata()
+
+    def process_item(self, item):
+        """Schedule a backfill."""
+        if isinstance(item, BackfillComicsTask):
+            self._check_db = True
+            self._next_batch_time = time() + self.IDLE_DELAY
+        else:
+            self.log.warning(f"Bad task sent to comic backfill: {item}")
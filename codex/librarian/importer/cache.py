@@ -4,9 +4,11 @@ from django.db.models.aggregates import Count
 from django.db.models.functions.datetime import Now
 from django.db.models.query import Q
 
+from codex.librarian.importer.const import COMIC_GROUP_FIELD_NAMES
 from codex.librarian.importer.init import InitImporter
 from codex.librarian.importer.status import ImportStatusTypes
-from codex.models import StoryArc, Volume
+from codex.models import Comic, StoryArc, Volume
+from codex.settings.settings import FILTER_BATCH_SIZE
 from codex.status import Status
 from codex.views.const import GROUP_MODELS
 
@@ -16,6 +18,114 @@ _UPDATE_FIELDS = ("updated_at",)
 class CacheUpdateImporter(InitImporter):
     """Update Groups timestamp for cover cache busting."""
 
+    ###########
+    # TOUCHED #
+    ###########
+    @staticmethod
+    def _get_group_model(field_name):
+        """Get the group model for a comic group field."""
+        if field_name == "story_arc_numbers":
+            return StoryArc
+        return Comic._meta.get_field(field_name).related_model
+
+    @classmethod
+    def init_comic_groups(cls):
+        """Init a group model to pks map."""
+        return {
+            cls._get_group_model(field_name): set()
+            for field_name in COMIC_GROUP_FIELD_NAMES
+        }
+
+    @staticmethod
+    def _get_comic_group_pks_qs(field_name, comic_pks_qs):
+        """Get a distinct group pks query for a set of comics."""
+        if field_name == "story_arc_numbers":
+            model = Comic.story_arc_numbers.through
+            value_field = "storyarcnumber__story_arc_id"
+        elif field_name == "folders":
+            model = Comic.folders.through
+            value_field = "folder_id"
+        else:
+            return (
+                Comic.objects.filter(pk__in=comic_pks_qs)
+                .order_by()
+                .values_list(f"{field_name}_id", flat=True)
+                .distinct()
+            )
+        return (
+            model.objects.filter(comic_id__in=comic_pks_qs)
+            .order_by()
+            .values_list(value_field, flat=True)
+            .distinct()
+        )
+
+    @classmethod
+    def populate_comic_groups(cls, comic_qs, comic_groups):
+        """Populate the groups a set of comics belong to."""
+        comic_pks_qs = comic_qs.values("pk")
+        for field_name in COMIC_GROUP_FIELD_NAMES:
+            related_model = cls._get_group_model(field_name)
+            group_pks_qs = cls._get_comic_group_pks_qs(field_name, comic_pks_qs)
+            comic_groups[related_model].update(group_pks_qs)
+
+    def touch_groups(self, model, pks):
+        """Record groups touched by this import."""
+        self.touched_groups.setdefault(model, set()).update(pks)
+
+    def touch_comic_groups(self, paths):
+        """Record the groups of comics touched by this import."""
+        paths = tuple(paths)
+        comic_groups = self.init_comic_groups()
+        for start in range(0, len(paths), FILTER_BATCH_SIZE):
+            comic_qs = Comic.objects.filter(
+                library=self.library, path__in=paths[start : start + FILTER_BATCH_SIZE]
+            )
+            self.populate_comic_groups(comic_qs, comic_groups)
+        for model, pks in comic_groups.items():
+            self.touch_groups(model, pks)
+
+    @staticmethod
+    def _update_touched_group_model(model, pks):
+        """Bump timestamps for only the given groups."""
+        pks = tuple(pks)
+        count = 0
+        for start in range(0, len(pks), FILTER_BATCH_SIZE):
+            count += model.objects.filter(
+                pk__in=pks[start : start + FILTER_BATCH_SIZE]
+            ).update(updated_at=Now())
+        return count
+
+    def update_touched_groups(self, force_update_group_map):
+        """Update timestamps for groups touched by this import."""
+        total_count = 0
+        status = Status(ImportStatusTypes.GROUP_UPDATE)
+        self.status_controller.start(status)
+        try:
+            log_list = []
+            for model in GROUP_MODELS:
+                pks = self.touched_groups.get(model, set()) | (
+                    force_update_group_map.get(model, set())
+                )
+                if not pks:
+                    continue
+                count = self._update_touched_group_model(model, pks)
+                if count:
+                    log_list.append(f"{count} {model.__name__}s")
+                status.add_complete(count)
+                self.status_controller.update(status, notify=False)
+                total_count += count
+
+            if total_count:
+                groups_log = ", ".join(log_list)
+                self.log.info(f"Updated timestamps for {groups_log}.")
+                self.changed += total_count
+        finally:
+            self.touched_groups = {}
+            self.status_controller.finish(status)
+
+    ########
+    # SCAN #
+    ########
     @staticmethod
     def _get_update_filter(model, start_time, force_update_group_map):
         # Get groups with comics updated during this import
@@ -66,7 +176,7 @@ class CacheUpdateImporter(InitImporter):
         return count
 
     def update_all_groups(self, force_update_group_map, start_time):
-        """Update timestamps for each group for cover cache busting."""
+        """Scan all groups for changes since start_time and update timestamps."""
         total_count = 0
         status = Status(ImportStatusTypes.GROUP_UPDATE)
         self.status_controller.start(status)
@@ -191,6 +191,7 @@ MDS = "mds"
 M2M_MDS = "m2m_mds"
 FKS = "fks"
 FIS = "fis"
+COVER_THUMBNAILS = "cover_thumbnails"
 FK_CREATE = "fk_create"
 COVERS_UPDATE = "covers_update"
 COVERS_CREATE = "covers_create"
@@ -3,10 +3,12 @@
 from django.db.models import NOT_PROVIDED
 from django.db.models.functions import Now
 
+from codex.librarian.covers.create import CoverCreateThread
 from codex.librarian.importer.const import (
     BULK_CREATE_COMIC_FIELDS,
     BULK_UPDATE_COMIC_FIELDS,
     BULK_UPDATE_COMIC_FIELDS_WITH_VALUES,
+    COVER_THUMBNAILS,
     MDS,
 )
 from codex.librarian.importer.link_comics import LinkComicsImporter
@@ -14,24 +16,30 @@ from codex.librarian.importer.status import ImportStatusTypes
 from codex.models import (
     Comic,
 )
+from codex.settings.settings import FILTER_BATCH_SIZE
 from codex.status import Status
 
+_BULK_UPDATE_COMIC_FIELD_ATTNAMES = tuple(
+    (field_name, Comic._meta.get_field(field_name).attname)
+    for field_name in BULK_UPDATE_COMIC_FIELDS_WITH_VALUES
+)
+
 
 class CreateComicsImporter(LinkComicsImporter):
     """Create comics methods."""
 
-    def _bulk_update_comics_add_comic(self, comic, results):
+    def _bulk_update_comics_add_comic(self, comic, results, fk_pks_map):
         """Add one comic and stats to the bulk update list."""
         try:
             md = self.metadata[MDS].pop(comic.path)
-            self.get_comic_fk_links(md, comic.path)
-            for field_name in BULK_UPDATE_COMIC_FIELDS_WITH_VALUES:
-                value = md.get(field_name)
+            self.get_comic_fk_links(md, comic.path, fk_pks_map)
+            for field_name, attname in _BULK_UPDATE_COMIC_FIELD_ATTNAMES:
+                value = md.get(attname)
                 if value is None:
                     default_value = Comic._meta.get_field(field_name).default
                     if default_value != NOT_PROVIDED:
                         value = default_value
-                setattr(comic, field_name, value)
+                setattr(comic, attname, value)
             comic.presave()
             comic.updated_at = Now()
             update_comics, comic_pks, comic_update_paths = results
@@ -41,7 +49,31 @@ class CreateComicsImporter(LinkComicsImporter):
         except Exception:
             self.log.exception(f"Error preparing {comic} for update.")
 
-    def bulk_update_comics(self):
+    def _get_comic_fk_pks_map_for_paths(self, paths):
+        """Build the foreign key pk map for the aggregated paths."""
+        mds = self.metadata[MDS]
+        return self.get_comic_fk_pks_map(
+            (path, mds[path]) for path in paths if path in mds
+        )
+
+    def _start_comics_status(self, status_type, num_paths, status):
+        """Start a status for these paths, or continue the whole import's status."""
+        own_status = status is None
+        if own_status:
+            status = Status(status_type, None, num_paths)
+        if own_status or not status.since:
+            self.status_controller.start(status)
+        return status, own_status
+
+    def _finish_comics_status(self, status, num_paths, *, own_status):
+        """Finish a status for these paths, or add them to the import's status."""
+        if own_status:
+            self.status_controller.finish(status)
+        else:
+            status.add_complete(num_paths)
+            self.status_controller.update(status)
+
+    def bulk_update_comics(self, status=None):
         """Bulk update comics, and move nonextant comics into create job.."""
         num_comics = len(self.task.files_modified)
         if not num_comics:
@@ -50,8 +82,9 @@ class CreateComicsImporter(LinkComicsImporter):
         self.log.debug(
             f"Preparing {num_comics} comics for update in library {self.library.path}."
         )
-        status = Status(ImportStatusTypes.FILES_MODIFIED, None, num_comics)
-        self.status_controller.start(status)
+        status, own_status = self._start_comics_status(
+            ImportStatusTypes.FILES_MODIFIED, num_comics, status
+        )
         # Get existing comics to update
         comics = Comic.objects.filter(
             library=self.library, path__in=self.task.files_modified
@@ -62,8 +95,9 @@ class CreateComicsImporter(LinkComicsImporter):
         comic_pks = []
         comic_update_paths = set()
         results = update_comics, comic_pks, comic_update_paths
+        fk_pks_map = self._get_comic_fk_pks_map_for_paths(self.task.files_modified)
         for comic in comics.iterator():
-            self._bulk_update_comics_add_comic(comic, results)
+            self._bulk_update_comics_add_comic(comic, results, fk_pks_map)
 
         converted_create_paths = frozenset(
             set(self.task.files_modified) - comic_update_paths
@@ -87,26 +121,28 @@ class CreateComicsImporter(LinkComicsImporter):
 
         self.task.files_modified = frozenset()
 
-        self.status_controller.finish(status)
+        self._finish_comics_status(status, num_comics, own_status=own_status)
         return count
 
-    def bulk_create_comics(self):
+    def bulk_create_comics(self, status=None):
         """Bulk create comics."""
-        num_comics = len(self.task.files_created)
-        if not num_comics:
-            return num_comics
+        num_paths = len(self.task.files_created)
+        if not num_paths:
+            return num_paths
         # prepare create comics
         self.log.debug(
-            f"Preparing {num_comics} comics for creation in library {self.library.path}."
+            f"Preparing {num_paths} comics for creation in library {self.library.path}."
+        )
+        status, own_status = self._start_comics_status(
+            ImportStatusTypes.FILES_CREATED, num_paths, status
         )
-        status = Status(ImportStatusTypes.FILES_CREATED, None, num_comics)
-        self.status_controller.start(status)
 
         create_comics = []
+        fk_pks_map = self._get_comic_fk_pks_map_for_paths(self.task.files_created)
         for path in sorted(self.task.files_created):
             try:
                 md = self.metadata[MDS].pop(path, {})
-                self.get_comic_fk_links(md, path)
+                self.get_comic_fk_links(md, path, fk_pks_map)
                 comic = Comic(**md, library=self.library)
                 comic.presave()
                 create_comics.append(comic)
@@ -135,5 +171,24 @@ class CreateComicsImporter(LinkComicsImporter):
                 self.log.exception(f"While creating {num_comics} comics")
 
         self.changed += count
-        self.status_controller.finish(status)
+        self._finish_comics_status(status, num_paths, own_status=own_status)
+        return count
+
+    def save_cover_thumbnails(self):
+        """Send cover thumbnails created during extraction to the cover cache."""
+        cover_thumbnails = self.metadata.pop(COVER_THUMBNAILS, {})
+        paths = tuple(cover_thumbnails)
+        count = 0
+        for start in range(0, len(paths), FILTER_BATCH_SIZE):
+            comic_pks = Comic.objects.filter(
+                library=self.library, path__in=paths[start : start + FILTER_BATCH_SIZE]
+            ).values_list("path", "pk")
+            for path, pk in comic_pks:
+                for task in CoverCreateThread.get_cover_save_tasks(
+                    pk, custom=False, thumbnails=cover_thumbnails[path]
+                ):
+                    self.librarian_queue.put(task)
+                count += 1
+        if count:
+            self.log.debug(f"Created {count} comic covers during import.")
         return count
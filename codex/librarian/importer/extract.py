@@ -1,13 +1,20 @@
 """Clean metadata before importing."""
 
+import re
+from argparse import Namespace
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from contextlib import suppress
 from decimal import ROUND_DOWN, Decimal
 from html import unescape
+from itertools import islice
+from multiprocessing import cpu_count, get_context
+from types import MappingProxyType
 from typing import Any
 from zipfile import BadZipFile
 
 from comicbox.box import Comicbox
 from comicbox.box.computed import IDENTIFIERS_KEY
+from comicbox.config import get_config
 from comicbox.exceptions import UnsupportedArchiveTypeError
 from comicbox.schemas.comicbox_mixin import CONTRIBUTORS_KEY
 from django.db.models.fields import (
@@ -19,8 +26,15 @@ from django.db.models.fields import (
 from nh3 import clean
 from rarfile import BadRarFile
 
-from codex.librarian.importer.const import FIS, STORY_ARCS_METADATA_KEY
+from codex.librarian.covers.create import CoverCreateThread
+from codex.librarian.importer.const import (
+    COVER_THUMBNAILS,
+    FIS,
+    STORY_ARCS_METADATA_KEY,
+)
+from codex.librarian.importer.metadata_cache import MetadataCache
 from codex.librarian.importer.query_fks import QueryForeignKeysImporter
+from codex.logger.logger import get_logger
 from codex.models import Comic
 from codex.models.named import (
     ContributorPerson,
@@ -29,6 +43,7 @@ from codex.models.named import (
     IdentifierType,
     StoryArc,
 )
+from codex.settings.settings import CPU_MULTIPLIER
 
 _MD_INVALID_KEYS = frozenset(
     (
@@ -80,7 +95,70 @@ _PSI_MAX = 2**31 - 1
 _SI_MIN = 2**15 * -1
 _SI_MAX = 2**15 - 1
 _DECIMAL_ZERO = Decimal("0.00")
+# Characters that nh3 clean & unescape can change. Verified over all of unicode.
+_HTML_CLEAN_RE = re.compile("[<&\r\x00\ufeff]")
+
+
+def _get_max_length(model, field_name):
+    return getattr(model._meta.get_field(field_name), "max_length", 0) or 0
+
+
+def _get_error_value(field_name, not_null_value):
+    return None if Comic._meta.get_field(field_name).null else not_null_value
+
+
+def _get_decimal_cleaner(field_name):
+    field: DecimalField = Comic._meta.get_field(field_name)  # type: ignore[reportAssignmentType]
+    quantizer = Decimal(f"1e-{field.decimal_places}")
+    decimal_max = Decimal(10 ** (field.max_digits - 2) - 1)
+    return quantizer, decimal_max, _get_error_value(field_name, _DECIMAL_ZERO)
+
+
+# Precompiled cleaning schema
+_STR_MAX_LENGTHS = MappingProxyType(
+    {key: _get_max_length(Comic, key) for key in _MD_STR_KEYS}
+)
+_DECIMAL_CLEANERS = MappingProxyType(
+    {key: _get_decimal_cleaner(key) for key in _MD_DECIMAL_KEYS}
+)
+_PSI_ERROR_VALUES = MappingProxyType(
+    {key: _get_error_value(key, 0) for key in _MD_PSI_KEYS}
+)
+# Volume name is cleaned in the sub dict, but errors fell back to Comic.name.
+_VOLUME_NAME_ERROR_VALUE = _get_error_value("name", 0)
+_CONTRIBUTOR_ROLE_MAX_LEN = _get_max_length(ContributorRole, "name")
+_CONTRIBUTOR_PERSON_MAX_LEN = _get_max_length(ContributorPerson, "name")
+_STORY_ARC_MAX_LEN = _get_max_length(StoryArc, "name")
+_IDENTIFIER_TYPE_MAX_LEN = _get_max_length(IdentifierType, "name")
+_IDENTIFIER_NSS_MAX_LEN = _get_max_length(Identifier, "nss")
+_IDENTIFIER_URL_MAX_LEN = _get_max_length(Identifier, "url")
+_DICT_FIELD_CLEANERS = (
+    (CONTRIBUTORS_KEY, "_clean_contributors"),
+    (STORY_ARCS_METADATA_KEY, "_clean_story_arcs"),
+    (IDENTIFIERS_KEY, "_clean_identifiers"),
+)
 _ALPHA_2_LEN = 2
+_FAILED_IMPORT_WARN_EXCEPTIONS = (
+    UnsupportedArchiveTypeError,
+    BadRarFile,
+    BadZipFile,
+    OSError,
+)
+_EXTRACT_MAX_WORKERS = max(1, int(cpu_count() * CPU_MULTIPLIER))
+# Small imports aren't worth the cost of starting worker processes.
+_EXTRACT_POOL_MIN_PATHS = 32
+# Bound the number of submitted and unconsumed results in memory.
+_EXTRACT_MAX_IN_FLIGHT_PER_WORKER = 4
+_METADATA_CACHE = MetadataCache()
+# Parse only the filename without opening the archive.
+_FILENAME_ONLY_CONFIG = get_config(
+    Namespace(comicbox=Namespace(read=["filename"], compute_pages=False))
+)
+
+
+def _init_extract_worker(log_queue):
+    """Send extract worker process logs to the codex log queue."""
+    get_logger(None, log_queue)
 
 
 class ExtractMetadataImporter(QueryForeignKeysImporter):
@@ -109,38 +187,34 @@ class ExtractMetadataImporter(QueryForeignKeysImporter):
         else:
             md[key] = value
 
-    @classmethod
-    def _clean_decimal(cls, value, field_name: str):
-        field: DecimalField = Comic._meta.get_field(field_name)  # type: ignore[reportAssignmentType]
+    @staticmethod
+    def _clean_decimal(value, cleaner):
+        quantizer, decimal_max, error_value = cleaner
         try:
-            quantize_str = Decimal(f"1e-{field.decimal_places}")
-            value = value.quantize(quantize_str, rounding=ROUND_DOWN)
-            decimal_max = Decimal(10 ** (field.max_digits - 2) - 1)
+            value = value.quantize(quantizer, rounding=ROUND_DOWN)
             value = value.min(decimal_max)
         except Exception:
-            value = None if field.null else _DECIMAL_ZERO
+            value = error_value
         return value
 
     @classmethod
     def _clean_comic_decimals(cls, md: dict[str, Any]) -> None:
         """Clean decimal values."""
-        for key in _MD_DECIMAL_KEYS:
+        for key, cleaner in _DECIMAL_CLEANERS.items():
             value = md.get(key)
             if value is None:
                 continue
-            value = cls._clean_decimal(value, key)
+            value = cls._clean_decimal(value, cleaner)
             cls._assign_or_pop(md, key, value)
 
     @staticmethod
-    def _clean_int(md, key, minimum, maximum):
+    def _clean_int(value, minimum, maximum, error_value):
         try:
-            value = md.get(key)
             if value is not None:
                 value = min(value, maximum)
                 value = max(value, minimum)
         except Exception:
-            field = Comic._meta.get_field(key)
-            value = None if field.null else 0
+            value = error_value
         return value
 
     @classmethod
@@ -149,8 +223,8 @@ class ExtractMetadataImporter(QueryForeignKeysImporter):
         md: dict[str, Any],
     ) -> None:
         """Clean positive small integers."""
-        for key in _MD_PSI_KEYS:
-            value = cls._clean_int(md, key, 0, _PSI_MAX)
+        for key, error_value in _PSI_ERROR_VALUES.items():
+            value = cls._clean_int(md.get(key), 0, _PSI_MAX, error_value)
             cls._assign_or_pop(md, key, value)
 
     @classmethod
@@ -158,20 +232,20 @@ class ExtractMetadataImporter(QueryForeignKeysImporter):
         # clean sub value
         obj = md.get("volume", {})
         key = "name"
-        value = cls._clean_int(obj, key, _SI_MIN, _SI_MAX)
+        value = cls._clean_int(obj.get(key), _SI_MIN, _SI_MAX, _VOLUME_NAME_ERROR_VALUE)
         cls._assign_or_pop(obj, key, value)
 
     @staticmethod
-    def _clean_strfield(model, field_name, value):
+    def _clean_str(value, max_length):
         try:
             if value:
                 value = value.strip()
-                field = model._meta.get_field(field_name)  # type: ignore[reportAssignmentType]
-                max_length = getattr(field, "max_length", 0)
                 if max_length:
                     value = value[:max_length]
-                value = clean(value)
-                value = unescape(value)
+                # Sanitizing is a noop without these, and it's the slow part.
+                if _HTML_CLEAN_RE.search(value):
+                    value = clean(value)
+                    value = unescape(value)
             if not value:
                 value = None
         except Exception:
@@ -180,9 +254,9 @@ class ExtractMetadataImporter(QueryForeignKeysImporter):
 
     @classmethod
     def _clean_strfields(cls, md: dict[str, Any]) -> None:
-        for key in _MD_STR_KEYS:
+        for key, max_length in _STR_MAX_LENGTHS.items():
             value = md.get(key)
-            value = cls._clean_strfield(Comic, key, value)
+            value = cls._clean_str(value, max_length)
             cls._assign_or_pop(md, key, value)
 
     @classmethod
@@ -198,51 +272,48 @@ class ExtractMetadataImporter(QueryForeignKeysImporter):
         cls._assign_or_pop(md, key, value)
 
     @classmethod
-    def _clean_contributors(cls, md):
-        contributors = md.get(CONTRIBUTORS_KEY)
-        if not contributors:
-            return
+    def _clean_contributors(cls, contributors):
         clean_contributors = {}
         for role, persons in contributors.items():
-            clean_role = cls._clean_strfield(ContributorRole, "name", role)
+            clean_role = cls._clean_str(role, _CONTRIBUTOR_ROLE_MAX_LEN)
             clean_persons = set()
             for person in persons:
-                clean_person = cls._clean_strfield(ContributorPerson, "name", person)
-                if clean_person:
+                if clean_person := cls._clean_str(person, _CONTRIBUTOR_PERSON_MAX_LEN):
                     clean_persons.add(clean_person)
             clean_contributors[clean_role] = clean_persons
-        cls._assign_or_pop(md, CONTRIBUTORS_KEY, clean_contributors)
+        return clean_contributors
 
     @classmethod
-    def _clean_story_arcs(cls, md):
-        story_arcs = md.get(STORY_ARCS_METADATA_KEY)
-        if not story_arcs:
-            return
+    def _clean_story_arcs(cls, story_arcs):
         clean_story_arcs = {}
         for story_arc, number in story_arcs.items():
-            clean_story_arc = cls._clean_strfield(StoryArc, "name", story_arc)
-            if clean_story_arc:
+            if clean_story_arc := cls._clean_str(story_arc, _STORY_ARC_MAX_LEN):
                 clean_story_arcs[clean_story_arc] = number
-        cls._assign_or_pop(md, STORY_ARCS_METADATA_KEY, clean_story_arcs)
+        return clean_story_arcs
 
     @classmethod
-    def _clean_identifiers(cls, md):
-        identifiers = md.get(IDENTIFIERS_KEY)
-        if not identifiers:
-            return
+    def _clean_identifiers(cls, identifiers):
         clean_identifiers = {}
         for nid, identifier in identifiers.items():
-            clean_id_type = cls._clean_strfield(IdentifierType, "name", nid)
+            clean_id_type = cls._clean_str(nid, _IDENTIFIER_TYPE_MAX_LEN)
             nss = identifier.get("nss")
-            clean_nss = cls._clean_strfield(Identifier, "nss", nss)
+            clean_nss = cls._clean_str(nss, _IDENTIFIER_NSS_MAX_LEN)
             url = identifier.get("url")
-            clean_url = cls._clean_strfield(Identifier, "url", url)
+            clean_url = cls._clean_str(url, _IDENTIFIER_URL_MAX_LEN)
             if clean_nss:
                 clean_identifier = {"nss": nss}
                 if clean_url:
                     clean_identifier["url"] = url
                 clean_identifiers[clean_id_type] = clean_identifier
-        cls._assign_or_pop(md, IDENTIFIERS_KEY, clean_identifiers)
+        return clean_identifiers
+
+    @classmethod
+    def _clean_dict_fields(cls, md):
+        """Clean contributors, story arcs and identifiers in one pass."""
+        for key, method_name in _DICT_FIELD_CLEANERS:
+            if value := md.get(key):
+                value = getattr(cls, method_name)(value)
+                cls._assign_or_pop(md, key, value)
 
     @classmethod
     def _clean_md(cls, md):
@@ -253,32 +324,188 @@ class ExtractMetadataImporter(QueryForeignKeysImporter):
         cls._clean_comic_small_ints(md)
         cls._clean_comic_decimals(md)
         cls._clean_strfields(md)
-        cls._clean_contributors(md)
-        cls._clean_story_arcs(md)
-        cls._clean_identifiers(md)
+        cls._clean_dict_fields(md)
         return md
 
-    def extract_and_clean(self, path, import_metadata):
-        """Extract metadata from comic and clean it for codex."""
+    @staticmethod
+    def _extract_cover_thumbnail(cb, covers):
+        """Create the cover thumbnail from the already open archive."""
+        # Failures are left for the cover thread to create and report.
+        with suppress(Exception):
+            if cover_image := cb.get_cover_image():
+                covers[COVER_THUMBNAILS] = CoverCreateThread.create_thumbnails(
+                    cover_image
+                )
+
+    @classmethod
+    def _extract_metadata_from_archive(cls, path, covers=None, *, hash_content=False):
+        """Open the archive and extract cleaned metadata and its content hash."""
+        with Comicbox(path) as cb:
+            md = cb.to_dict()
+            md = md.get("comicbox", {})
+            if "file_type" not in md:
+                md["file_type"] = cb.get_file_type()
+            if "page_count" not in md:
+                md["page_count"] = cb.get_page_count()
+            if covers is not None:
+                cls._extract_cover_thumbnail(cb, covers)
+            content_hash = (
+                MetadataCache.get_content_hash(path, cb.infolist())
+                if hash_content
+                else None
+            )
+        md["path"] = path
+        return cls._clean_md(md), content_hash
+
+    @classmethod
+    def _extract_metadata_from_filename(cls, path):
+        """Parse cleaned metadata from the filename only."""
+        with Comicbox(path, config=_FILENAME_ONLY_CONFIG) as cb:
+            md = cb.to_dict()
+            md = md.get("comicbox", {})
+        # Empty file_type & page_count mark the comic for backfill.
+        md.pop("file_type", None)
+        md.pop("page_count", None)
+        md["path"] = path
+        return cls._clean_md(md)
+
+    @classmethod
+    def extract_metadata(
+        cls, path, import_metadata, *, stat_only=False, import_cover=False
+    ):
+        """Extract metadata from comic and clean it for codex. Runs in worker processes."""
+        if not import_metadata:
+            return cls._clean_md({"path": path})
+        if stat_only:
+            return cls._extract_metadata_from_filename(path)
+        # Metadata cache hits don't open the archive, so leave those covers for later.
+        covers = {} if import_cover else None
+        if _METADATA_CACHE.enabled:
+            md = _METADATA_CACHE.get_or_extract(
+                path,
+                lambda: cls._extract_metadata_from_archive(
+                    path, covers, hash_content=True
+                ),
+            )
+        else:
+            md, _ = cls._extract_metadata_from_archive(path, covers)
+        if covers:
+            md = {**md, **covers}
+        return md
+
+    def _get_extract_result(self, path, get_md):
+        """Get extracted metadata or record a failed import."""
         md = {}
-        failed_import = {}
         try:
-            if import_metadata:
-                with Comicbox(path) as cb:
-                    md = cb.to_dict()
-                    md = md.get("comicbox", {})
-                    if "file_type" not in md:
-                        md["file_type"] = cb.get_file_type()
-                    if "page_count" not in md:
-                        md["page_count"] = cb.get_page_count()
-            md["path"] = path
-            md = self._clean_md(md)
-        except (UnsupportedArchiveTypeError, BadRarFile, BadZipFile, OSError) as exc:
+            md = get_md()
+        except _FAILED_IMPORT_WARN_EXCEPTIONS as exc:
             self.log.warning(f"Failed to import {path}: {exc}")
-            failed_import = {path: exc}
+            self.metadata[FIS][path] = exc
         except Exception as exc:
             self.log.exception(f"Failed to import: {path}")
-            failed_import = {path: exc}
-        if failed_import:
-            self.metadata[FIS].update(failed_import)
+            self.metadata[FIS][path] = exc
         return md
+
+    def extract_and_clean(
+        self, path, import_metadata, *, stat_only=False, import_cover=False
+    ):
+        """Extract metadata from comic and clean it for codex."""
+        return self._get_extract_result(
+            path,
+            lambda: self.extract_metadata(
+                path, import_metadata, stat_only=stat_only, import_cover=import_cover
+            ),
+        )
+
+    def _get_extract_executor(self, num_workers):
+        """Get the extraction process pool, shared by every import chunk."""
+        if self._extract_executor is None:
+            # Spawn, because forking the multithreaded librarian process is unsafe.
+            self._extract_executor = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_extract_worker,
+                initargs=(self.log_queue,),
+            )
+        return self._extract_executor
+
+    def shutdown_extract_executor(self):
+        """Stop the extraction process pool."""
+        if self._extract_executor is None:
+            return
+        self._extract_executor.shutdown(wait=True, cancel_futures=True)
+        self._extract_executor = None
+
+    def _extract_and_clean_pool(
+        self, paths, import_metadata, stat_only_paths, num_workers, *, import_covers
+    ):
+        """Extract metadata in a process pool, yielding results as they finish."""
+        max_in_flight = num_workers * _EXTRACT_MAX_IN_FLIGHT_PER_WORKER
+        paths_iter = iter(paths)
+        in_flight = {}
+        executor = self._get_extract_executor(num_workers)
+        try:
+            while True:
+                for path in islice(paths_iter, max_in_flight - len(in_flight)):
+                    future = executor.submit(
+                        ExtractMetadataImporter.extract_metadata,
+                        path,
+                        import_metadata,
+                        stat_only=path in stat_only_paths,
+                        import_cover=import_covers,
+                    )
+                    in_flight[future] = path
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    yield path, self._get_extract_result(path, future.result)
+        finally:
+            # Don't leave work from an abandoned chunk in the shared pool.
+            for future in in_flight:
+                future.cancel()
+
+    def _cull_metadata_cache(self):
+        """Keep the metadata cache under its size cap."""
+        try:
+            if count := _METADATA_CACHE.cull():
+                self.log.debug(f"Culled {count} old metadata cache entries.")
+        except Exception:
+            self.log.exception("Culling metadata cache")
+
+    def extract_and_clean_many(
+        self,
+        paths,
+        import_metadata,
+        stat_only_paths=frozenset(),
+        *,
+        import_covers=False,
+    ):
+        """Extract and clean metadata for many comics, yielding (path, md)."""
+        num_workers = min(_EXTRACT_MAX_WORKERS, len(paths))
+        if (
+            import_metadata
+            and num_workers > 1
+            and len(paths) >= _EXTRACT_POOL_MIN_PATHS
+        ):
+            self.log.debug(f"Extracting metadata with {num_workers} processes.")
+            yield from self._extract_and_clean_pool(
+                paths,
+                import_metadata,
+                stat_only_paths,
+                num_workers,
+                import_covers=import_covers,
+            )
+        else:
+            for path in paths:
+                stat_only = path in stat_only_paths
+                yield (
+                    path,
+                    self.extract_and_clean(
+                        path,
+                        import_metadata,
+                        stat_only=stat_only,
+                        import_cover=import_covers,
+                    ),
+                )
@@ -25,10 +25,13 @@ class FailedImportsImporter(DeletedImporter):
             self.metadata[FIS].keys()
         )
 
+        # Comics ingested stat only still fail until they're read.
         succeeded_failed_imports = frozenset(
             Comic.objects.filter(
                 library=self.library, path__in=untouched_failed_import_paths
-            ).values_list("path", flat=True)
+            )
+            .exclude(file_type="")
+            .values_list("path", flat=True)
         )
 
         possibly_missing_failed_import_paths = (
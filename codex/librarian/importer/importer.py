@@ -1,18 +1,27 @@
 """The main importer class."""
 
+from math import ceil
 from time import time
 
 from django.core.cache import cache
 from humanize import naturaldelta
 
+from codex.librarian.covers.tasks import CoverPrewarmTask
 from codex.librarian.importer.moved import MovedImporter
 from codex.librarian.importer.status import ImportStatusTypes
+from codex.librarian.importer.tasks import BackfillComicsTask
 from codex.librarian.notifier.tasks import (
     FAILED_IMPORTS_CHANGED_TASK,
     LIBRARY_CHANGED_TASK,
 )
 from codex.librarian.search.tasks import SearchIndexUpdateTask
 from codex.librarian.tasks import DelayedTasks
+from codex.settings.settings import (
+    COVER_PREWARM,
+    IMPORT_CHUNK_SIZE,
+    STAT_ONLY_INGEST_THRESHOLD,
+)
+from codex.status import Status
 
 
 class ComicImporter(MovedImporter):
@@ -50,42 +59,130 @@ class ComicImporter(MovedImporter):
                 until, (SearchIndexUpdateTask(rebuild=False),)
             )
             self.librarian_queue.put(delayed_search_task)
+            if self.stat_only_ingest:
+                self.librarian_queue.put(BackfillComicsTask())
+            if COVER_PREWARM:
+                self.librarian_queue.put(CoverPrewarmTask(self.start_time))
         else:
             self.log.info("No updates neccissary.")
         if new_failed_imports:
             self.librarian_queue.put(FAILED_IMPORTS_CHANGED_TASK)
 
+    ##########
+    # IMPORT #
+    ##########
+    def _get_comic_path_chunks(self):
+        """Split modified and created paths into fixed size chunks."""
+        files_modified = frozenset(self.task.files_modified)
+        files_created = frozenset(self.task.files_created)
+        # Sorted so chunks share folders and groups.
+        paths = sorted(files_modified | files_created)
+        for start in range(0, len(paths), IMPORT_CHUNK_SIZE):
+            chunk = frozenset(paths[start : start + IMPORT_CHUNK_SIZE])
+            yield chunk & files_modified, chunk & files_created
+
+    def _import_comics_chunk(self, aggregate_status, modified_status, created_status):
+        """Aggregate, create and link one chunk of comics."""
+        #############
+        # AGGREGATE #
+        #############
+        self.get_aggregate_metadata(aggregate_status)
+        paths = self.task.files_modified | self.task.files_created
+        # Groups modified comics are leaving.
+        self.touch_comic_groups(self.task.files_modified)
+
+        #########
+        # QUERY #
+        #########
+        self.query_all_missing_fks()
+
+        #####################
+        # UPDATE AND CREATE #
+        #####################
+        self.create_all_fks()
+        num_created_paths = len(self.task.files_created)
+        imported_count = self.bulk_update_comics(modified_status)
+        if created_status and (
+            num_converted := len(self.task.files_created) - num_created_paths
+        ):
+            # Modified comics missing from the db are created instead.
+            created_status.total = (created_status.total or 0) + num_converted
+        imported_count += self.bulk_create_comics(created_status)
+        self.save_cover_thumbnails()
+
+        ########
+        # LINK #
+        ########
+        self.bulk_query_and_link_comic_m2m_fields()
+        self.touch_comic_groups(paths)
+        return imported_count
+
+    def _import_comics(self):
+        """Import modified and created comics in bounded memory chunks."""
+        total_paths = len(self.task.files_modified) + len(self.task.files_created)
+        if not total_paths:
+            return 0
+        num_chunks = ceil(total_paths / IMPORT_CHUNK_SIZE)
+        self.stat_only_ingest = bool(
+            STAT_ONLY_INGEST_THRESHOLD
+            and not self.task.force_import_metadata
+            and len(self.task.files_created) > STAT_ONLY_INGEST_THRESHOLD
+        )
+        if self.stat_only_ingest:
+            self.log.info(
+                f"Reading only filenames for {len(self.task.files_created)} new"
+                " comics. Page counts and tags will be backfilled."
+            )
+        status = Status(ImportStatusTypes.AGGREGATE_TAGS, 0, total_paths)
+        # Comic statuses span all chunks so progress doesn't restart each chunk.
+        modified_status = created_status = None
+        if num_modified := len(self.task.files_modified):
+            modified_status = Status(ImportStatusTypes.FILES_MODIFIED, 0, num_modified)
+        if num_created := len(self.task.files_created):
+            created_status = Status(ImportStatusTypes.FILES_CREATED, 0, num_created)
+        imported_count = 0
+        try:
+            self.status_controller.start(status, notify=False)
+            for index, (files_modified, files_created) in enumerate(
+                self._get_comic_path_chunks(), start=1
+            ):
+                if num_chunks > 1:
+                    self.log.debug(f"Importing comics chunk {index}/{num_chunks}...")
+                self.task.files_modified = files_modified
+                self.task.files_created = files_created
+                imported_count += self._import_comics_chunk(
+                    status, modified_status, created_status
+                )
+                if index < num_chunks and imported_count:
+                    # Each chunk is committed, show readers the progress.
+                    cache.clear()
+                    self.librarian_queue.put(LIBRARY_CHANGED_TASK)
+        finally:
+            self.shutdown_extract_executor()
+            self.status_controller.finish_many(
+                tuple(
+                    chunk_status
+                    for chunk_status in (status, modified_status, created_status)
+                    if chunk_status
+                )
+            )
+        self._cull_metadata_cache()
+        return imported_count
+
     def apply(self):
         """Bulk import comics."""
         try:
             self.init_apply()
             self.move_and_modify_dirs()
 
-            #############
-            # AGGREGATE #
-            #############
-            self.get_aggregate_metadata()
+            imported_count = self._import_comics()
 
-            #########
-            # QUERY #
-            #########
-            self.query_all_missing_fks()
+            ##########
+            # COVERS #
+            ##########
             self.query_missing_custom_covers()
-
-            #####################
-            # UPDATE AND CREATE #
-            #####################
-            self.create_all_fks()
             self.update_custom_covers()
             self.create_custom_covers()
-
-            imported_count = self.bulk_update_comics()
-            imported_count += self.bulk_create_comics()
-
-            ########
-            # LINK #
-            ########
-            self.bulk_query_and_link_comic_m2m_fields()
             self.link_custom_covers()
             self.changed += imported_count
 
@@ -93,7 +190,7 @@ class ComicImporter(MovedImporter):
 
             deleted_comic_groups = self.delete()
 
-            self.update_all_groups(deleted_comic_groups, self.start_time)
+            self.update_touched_groups(deleted_comic_groups)
 
         finally:
             self._finish_apply_status()
@@ -27,6 +27,11 @@ class InitImporter(WorkerBaseMixin):
         self.task: ImportDBDiffTask = task
         self.metadata: dict[str, Any] = {}
         self.changed: int = 0
+        self.stat_only_ingest: bool = False
+        # Metadata extraction process pool shared by import chunks.
+        self._extract_executor = None
+        # Group model to pks map for cover cache busting.
+        self.touched_groups: dict[type, set[int]] = {}
         self.library = Library.objects.only("path", "update_in_progress").get(
             pk=self.task.library_id
         )
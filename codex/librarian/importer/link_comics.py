@@ -2,6 +2,7 @@
 
 from collections.abc import Mapping
 from pathlib import Path
+from types import MappingProxyType
 
 from django.db.models import Q
 
@@ -30,8 +31,33 @@ from codex.models import (
     Volume,
 )
 from codex.models.named import Identifier
+from codex.settings.settings import FILTER_BATCH_SIZE
 from codex.status import Status
 
+_COMIC_GROUP_FK_FIELD_NAMES = (PUBLISHER, IMPRINT, SERIES, VOLUME, PARENT_FOLDER)
+_COMIC_FK_LOOKUP_MAP = MappingProxyType(
+    {
+        PUBLISHER: (Publisher, ("name",)),
+        IMPRINT: (Imprint, ("publisher__name", "name")),
+        SERIES: (Series, ("publisher__name", "imprint__name", "name")),
+        VOLUME: (
+            Volume,
+            ("publisher__name", "imprint__name", "series__name", "name"),
+        ),
+        PARENT_FOLDER: (Folder, ("path",)),
+        **{
+            field_name: (Comic._meta.get_field(field_name).related_model, ("name",))
+            for field_name in sorted(COMIC_FK_FIELD_NAMES)
+        },
+    }
+)
+_COMIC_FK_ATTNAMES = MappingProxyType(
+    {
+        field_name: Comic._meta.get_field(field_name).attname
+        for field_name in _COMIC_FK_LOOKUP_MAP
+    }
+)
+
 
 class LinkComicsImporter(LinkCoversImporter):
     """Link comics methods."""
@@ -43,31 +69,106 @@ class LinkComicsImporter(LinkCoversImporter):
         return md.get(field_name, group_class.DEFAULT_NAME)
 
     @classmethod
-    def get_comic_fk_links(cls, md, path):
-        """Get links for all foreign keys for creating and updating."""
+    def _get_comic_fk_keys(cls, md, path):
+        """Get the lookup keys for all of a comic's foreign keys."""
         publisher_name = cls._get_group_name(Publisher, md)
         imprint_name = cls._get_group_name(Imprint, md)
         series_name = cls._get_group_name(Series, md)
         volume_name = cls._get_group_name(Volume, md)
-        md[PUBLISHER] = Publisher.objects.get(name=publisher_name)
-        md[IMPRINT] = Imprint.objects.get(
-            publisher__name=publisher_name, name=imprint_name
-        )
-        md[SERIES] = Series.objects.get(
-            publisher__name=publisher_name, imprint__name=imprint_name, name=series_name
-        )
-        md[VOLUME] = Volume.objects.get(
-            publisher__name=publisher_name,
-            imprint__name=imprint_name,
-            series__name=series_name,
-            name=volume_name,
+        fk_keys = {
+            PUBLISHER: publisher_name,
+            IMPRINT: (publisher_name, imprint_name),
+            SERIES: (publisher_name, imprint_name, series_name),
+            VOLUME: (publisher_name, imprint_name, series_name, volume_name),
+            PARENT_FOLDER: str(Path(path).parent),
+        }
+        for field_name in COMIC_FK_FIELD_NAMES:
+            if name := md.get(field_name):
+                fk_keys[field_name] = name
+        return fk_keys
+
+    @staticmethod
+    def _get_comic_fk_name_filters(key_field, names):
+        """Get batched set filters for single field keys."""
+        query_filters = []
+        if None in names:
+            names.discard(None)
+            query_filters.append(Q(**{f"{key_field}__isnull": True}))
+        names = tuple(names)
+        query_filters.extend(
+            Q(**{f"{key_field}__in": names[start : start + FILTER_BATCH_SIZE]})
+            for start in range(0, len(names), FILTER_BATCH_SIZE)
         )
-        parent_path = Path(path).parent
-        md[PARENT_FOLDER] = Folder.objects.get(path=parent_path)
+        return query_filters
+
+    @staticmethod
+    def _get_comic_fk_tuple_filters(key_fields, keys):
+        """Get batched filters matching every field of multi field keys."""
+        keys = tuple(keys)
+        # Keep each batch's parameters under the db variable limit.
+        batch_size = max(1, FILTER_BATCH_SIZE // len(key_fields))
+        query_filters = []
+        for start in range(0, len(keys), batch_size):
+            query_filter = Q()
+            for key in keys[start : start + batch_size]:
+                query_filter |= Q(**dict(zip(key_fields, key, strict=True)))
+            query_filters.append(query_filter)
+        return query_filters
+
+    def _query_comic_fk_pks(self, field_name, keys, fk_pks):
+        """Query the pks for one foreign key field with batched queries."""
+        model, key_fields = _COMIC_FK_LOOKUP_MAP[field_name]
+        if len(key_fields) == 1:
+            query_filters = self._get_comic_fk_name_filters(key_fields[0], set(keys))
+        else:
+            query_filters = self._get_comic_fk_tuple_filters(key_fields, keys)
+        qs = model.objects.all()
+        if model == Folder:
+            qs = qs.filter(library=self.library)
+        for query_filter in query_filters:
+            rows = qs.filter(query_filter).values_list(*key_fields, "pk")
+            for row in rows:
+                key = row[0] if len(key_fields) == 1 else row[:-1]
+                fk_pks[key] = row[-1]
+
+    def get_comic_fk_pks_map(self, mds):
+        """Build a map of all foreign key pks for many comics at once."""
+        all_keys = {field_name: set() for field_name in _COMIC_FK_LOOKUP_MAP}
+        for path, md in mds:
+            for field_name, key in self._get_comic_fk_keys(md, path).items():
+                all_keys[field_name].add(key)
+
+        fk_pks_map = {}
+        for field_name, keys in all_keys.items():
+            fk_pks = {}
+            if keys:
+                self._query_comic_fk_pks(field_name, keys, fk_pks)
+            fk_pks_map[field_name] = fk_pks
+        return fk_pks_map
+
+    @staticmethod
+    def _get_comic_fk_pk(field_name, key, fk_pks):
+        """Get one pk from the map, falling back to the db for collation matches."""
+        pk = fk_pks.get(key)
+        if pk is None:
+            model, key_fields = _COMIC_FK_LOOKUP_MAP[field_name]
+            keys = key if isinstance(key, tuple) else (key,)
+            fk_filter = dict(zip(key_fields, keys, strict=True))
+            pk = model.objects.values_list("pk", flat=True).get(**fk_filter)
+            fk_pks[key] = pk
+        return pk
+
+    @classmethod
+    def get_comic_fk_links(cls, md, path, fk_pks_map):
+        """Set foreign key ids for creating and updating."""
+        fk_keys = cls._get_comic_fk_keys(md, path)
         for field_name in COMIC_FK_FIELD_NAMES:
-            name = md.pop(field_name, None)
-            if name and (fk_class := Comic._meta.get_field(field_name).related_model):
-                md[field_name] = fk_class.objects.get(name=name)
+            md.pop(field_name, None)
+        for field_name in _COMIC_GROUP_FK_FIELD_NAMES:
+            md.pop(field_name, None)
+        for field_name, key in fk_keys.items():
+            pk = cls._get_comic_fk_pk(field_name, key, fk_pks_map[field_name])
+            md[_COMIC_FK_ATTNAMES[field_name]] = pk
 
     @staticmethod
     def _get_link_folders_filter(_field_name, folder_paths):
@@ -152,6 +253,34 @@ class LinkComicsImporter(LinkCoversImporter):
         self.metadata.pop(M2M_MDS)
         return all_m2m_links, total
 
+    def _query_relation_adjustments_batch(
+        self,
+        m2m_links,
+        comic_pks,
+        ThroughModel,  # noqa:N803
+        through_field_id_name,
+    ):
+        """Diff one batch of comics' relations against the through table."""
+        extant_rows = ThroughModel.objects.filter(comic_id__in=comic_pks).values_list(
+            "pk", "comic_id", through_field_id_name
+        )
+        extant_map = {}
+        del_pks = set()
+        for pk, comic_pk, rel_pk in extant_rows:
+            if rel_pk in m2m_links[comic_pk]:
+                extant_map.setdefault(comic_pk, set()).add(rel_pk)
+            else:
+                del_pks.add(pk)
+
+        tms = []
+        for comic_pk in comic_pks:
+            missing_pks = m2m_links[comic_pk] - extant_map.get(comic_pk, set())
+            for pk in missing_pks:
+                defaults = {"comic_id": comic_pk, through_field_id_name: pk}
+                tm = ThroughModel(**defaults)
+                tms.append(tm)
+        return tms, del_pks
+
     def _query_relation_adjustments(
         self,
         m2m_links,
@@ -159,35 +288,22 @@ class LinkComicsImporter(LinkCoversImporter):
         through_field_id_name,
         status,
     ):
+        """Diff comics' relations against the through table in batches."""
+        m2m_links = {comic_pk: set(pks) for comic_pk, pks in m2m_links.items()}
+        all_comic_pks = tuple(m2m_links.keys())
         all_del_pks = set()
         tms = []
-        for comic_pk, pks in m2m_links.items():
-            del_query = ~Q(**{through_field_id_name + "__in": pks})
-            del_pks = (
-                ThroughModel.objects.filter(comic_id=comic_pk)
-                .filter(del_query)
-                .values_list("pk", flat=True)
+        for start in range(0, len(all_comic_pks), FILTER_BATCH_SIZE):
+            comic_pks = all_comic_pks[start : start + FILTER_BATCH_SIZE]
+            batch_tms, del_pks = self._query_relation_adjustments_batch(
+                m2m_links, comic_pks, ThroughModel, through_field_id_name
             )
-            all_del_pks |= set(del_pks)
+            tms.extend(batch_tms)
+            all_del_pks |= del_pks
             if status:
                 status.total = status.total or 0
-                status.total += len(del_pks)
+                status.total += len(del_pks) + len(batch_tms)
                 self.status_controller.update(status)
-
-            extant_pks = set(
-                ThroughModel.objects.filter(comic_id=comic_pk).values_list(
-                    through_field_id_name, flat=True
-                )
-            )
-            missing_pks = set(pks) - extant_pks
-            if status:
-                status.total = status.total or 0
-                status.total += len(missing_pks)
-                self.status_controller.update(status)
-            for pk in missing_pks:
-                defaults = {"comic_id": comic_pk, through_field_id_name: pk}
-                tm = ThroughModel(**defaults)
-                tms.append(tm)
         return tms, all_del_pks
 
     def bulk_fix_comic_m2m_field(self, field_name, m2m_links, status):
@@ -230,8 +346,10 @@ class LinkComicsImporter(LinkCoversImporter):
         self.status_controller.update(status)
 
         if del_count := len(all_del_pks):
-            del_qs = ThroughModel.objects.filter(pk__in=all_del_pks)
-            del_qs.delete()
+            all_del_pks = tuple(all_del_pks)
+            for start in range(0, del_count, FILTER_BATCH_SIZE):
+                del_pks = all_del_pks[start : start + FILTER_BATCH_SIZE]
+                ThroughModel.objects.filter(pk__in=del_pks).delete()
             self.log.info(
                 f"Deleted {del_count} stale {field_name} relations for altered comics.",
             )
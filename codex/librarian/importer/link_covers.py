@@ -68,6 +68,13 @@ class LinkCoversImporter(FailedImportsImporter):
             total_count = 0
             for model, objs in model_map.items():
                 total_count += self._link_custom_cover_group(model, objs, status)
+
+            # Groups with new or changed custom covers.
+            for model in CLASS_CUSTOM_COVER_GROUP_MAP:
+                pks = model.objects.filter(custom_cover__in=link_cover_pks).values_list(
+                    "pk", flat=True
+                )
+                self.touch_groups(model, pks)
         finally:
             self.status_controller.finish(status)
         return total_count
@@ -0,0 +1,177 @@
+"""Persistent on-disk cache of extracted comic metadata."""
+
+import os
+import pickle
+from contextlib import suppress
+from hashlib import blake2b
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from zipfile import ZipFile, ZipInfo, is_zipfile
+
+from comicbox.version import VERSION as COMICBOX_VERSION
+from rarfile import RarFile, RarInfo, is_rarfile
+
+from codex.settings.settings import METADATA_CACHE_MAX_SIZE, ROOT_CACHE_PATH
+from codex.version import VERSION
+
+# Cleaned metadata changes shape with codex & comicbox versions.
+_CACHE_VERSION = f"{VERSION}:{COMICBOX_VERSION}:2"
+_PATH_STEP = 2
+_PATH_DEPTH = 2
+# Cull down to this fraction of the max size to avoid culling every import.
+_CULL_LOW_WATER = 0.9
+# Zip comments end the file and rar comments follow its first headers.
+_EDGE_SIZE = 65535 + 22
+
+
+class MetadataCache:
+    """Cache cleaned comic metadata keyed by file identity."""
+
+    ROOT = ROOT_CACHE_PATH / "metadata"
+
+    def __init__(self, root: Path = ROOT, max_size: int = METADATA_CACHE_MAX_SIZE):
+        """Set root and size cap."""
+        self.root = root
+        self.max_size = max_size
+
+    @property
+    def enabled(self):
+        """Return if the cache is enabled."""
+        return self.max_size > 0
+
+    def _get_entry_path(self, path: str) -> Path:
+        """Translate a comic path into a fanned out cache entry path."""
+        hex_str = blake2b(path.encode(), digest_size=16).hexdigest()
+        parts = [
+            hex_str[i : i + _PATH_STEP]
+            for i in range(0, _PATH_STEP * _PATH_DEPTH, _PATH_STEP)
+        ]
+        return self.root.joinpath(*parts, hex_str)
+
+    @staticmethod
+    def _get_stat_key(path: str):
+        """Get the cheap file identity key."""
+        st = Path(path).stat()
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    @staticmethod
+    def get_content_hash(path: str, infolist=None) -> str | None:
+        """Hash the archive's table of contents without decompressing anything."""
+        if infolist is None:
+            if is_zipfile(path):
+                archive_class = ZipFile
+            elif is_rarfile(path):
+                archive_class = RarFile
+            else:
+                return None
+            with archive_class(path) as archive:
+                infolist = archive.infolist()
+        elif not all(isinstance(info, ZipInfo | RarInfo) for info in infolist):
+            return None
+        # Member names, CRCs and sizes cover embedded metadata files and pages.
+        hasher = blake2b(digest_size=16)
+        for info in sorted(infolist, key=lambda info: info.filename):
+            hasher.update(f"{info.filename}\0{info.CRC}\0{info.file_size}\n".encode())
+        # The edges hold the archive comments.
+        with Path(path).open("rb") as archive_file:
+            fd = archive_file.fileno()
+            size = os.fstat(fd).st_size
+            hasher.update(os.pread(fd, _EDGE_SIZE, 0))
+            hasher.update(os.pread(fd, _EDGE_SIZE, max(size - _EDGE_SIZE, 0)))
+        return hasher.hexdigest()
+
+    def _read_entry(self, entry_path: Path) -> dict | None:
+        """Read a cache entry if it is valid."""
+        try:
+            with entry_path.open("rb") as f:
+                entry = pickle.load(f)  # noqa: S301
+        except FileNotFoundError:
+            return None
+        except Exception:
+            entry_path.unlink(missing_ok=True)
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != _CACHE_VERSION:
+            return None
+        return entry
+
+    def _write_entry(self, entry_path: Path, entry: dict):
+        """Write a cache entry atomically."""
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(
+            dir=entry_path.parent, prefix=".", delete=False
+        ) as tmp_file:
+            pickle.dump(entry, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        Path(tmp_file.name).replace(entry_path)
+
+    def _content_hit(self, path, entry, stat_key) -> tuple[bool, str | None]:
+        """Check the content hash when only the mtime or inode changed."""
+        if entry is None or entry.get("content_hash") is None:
+            return False, None
+        size, _, _ = stat_key
+        if entry["stat_key"][0] != size:
+            return False, None
+        content_hash = self.get_content_hash(path)
+        return content_hash == entry["content_hash"], content_hash
+
+    def get_or_extract(self, path: str, extract):
+        """
+        Return cached metadata or extract, clean and cache it.
+
+        extract returns the metadata and the content hash of the archive it
+        opened, so a miss doesn't open the archive again just to hash it.
+        """
+        if not self.enabled:
+            return extract()[0]
+        stat_key = self._get_stat_key(path)
+        entry_path = self._get_entry_path(path)
+        entry = self._read_entry(entry_path)
+        if entry and entry.get("path") != path:
+            entry = None
+
+        if entry and entry["stat_key"] == stat_key:
+            # Bump for LRU
+            with suppress(OSError):
+                os.utime(entry_path)
+            return entry["md"]
+
+        hit, content_hash = self._content_hit(path, entry, stat_key)
+        if hit and entry:
+            md = entry["md"]
+        else:
+            md, content_hash = extract()
+
+        entry = {
+            "version": _CACHE_VERSION,
+            "path": path,
+            "stat_key": stat_key,
+            "content_hash": content_hash,
+            "md": md,
+        }
+        self._write_entry(entry_path, entry)
+        return md
+
+    def cull(self) -> int:
+        """Evict least recently used entries until the cache is under its cap."""
+        if not self.root.is_dir():
+            return 0
+        entries = []
+        total_size = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                entry_path = Path(dirpath) / filename
+                with suppress(OSError):
+                    st = entry_path.stat()
+                    entries.append((st.st_mtime, st.st_size, entry_path))
+                    total_size += st.st_size
+        if total_size <= self.max_size:
+            return 0
+
+        low_water = self.max_size * _CULL_LOW_WATER
+        count = 0
+        for _, size, entry_path in sorted(entries):
+            if total_size <= low_water:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_size -= size
+            count += 1
+        return count
@@ -18,8 +18,12 @@ from codex.librarian.importer.const import (
 )
 from codex.librarian.importer.status import ImportStatusTypes
 from codex.models import Comic, CustomCover, Folder
+from codex.settings.settings import FILTER_BATCH_SIZE
 from codex.status import Status
 
+# Fields presave() reads, loaded up front to avoid a deferred query per field.
+_MOVED_PRESAVE_FIELDS = ("name", "year", "month", "day")
+
 
 class MovedImporter(AggregateMetadataImporter):
     """Methods for moving comics and folders."""
@@ -40,32 +44,56 @@ class MovedImporter(AggregateMetadataImporter):
         )
         self.bulk_folders_create(create_folder_paths, status)
 
-    def _prepare_moved_comic(self, comic, folder_m2m_links, updated_comics):
+    def _get_moved_comics_folder_pks_map(self):
+        """Map every destination parent folder path to its pk at once."""
+        folder_paths = set()
+        for new_path in self.task.files_moved.values():
+            folder_paths.update(str(parent) for parent in Path(new_path).parents)
+        folder_paths = tuple(folder_paths)
+        folder_pks_map = {}
+        for start in range(0, len(folder_paths), FILTER_BATCH_SIZE):
+            batch_paths = folder_paths[start : start + FILTER_BATCH_SIZE]
+            folders = Folder.objects.filter(
+                library=self.library, path__in=batch_paths
+            ).values_list("path", "pk")
+            folder_pks_map.update(folders)
+        return folder_pks_map
+
+    def _prepare_moved_comic(
+        self, comic, folder_pks_map, folder_m2m_links, updated_comics
+    ):
         """Prepare one comic for bulk update."""
         try:
             new_path = self.task.files_moved[comic.path]
             comic.path = new_path
             new_path = Path(new_path)
-            comic.parent_folder = Folder.objects.get(path=new_path.parent)
+            comic.parent_folder_id = folder_pks_map[str(new_path.parent)]  # type: ignore[reportAttributeAccessIssue]
             comic.updated_at = Now()
             comic.presave()
-            folder_m2m_links[comic.pk] = Folder.objects.filter(
-                path__in=new_path.parents
-            ).values_list("pk", flat=True)
+            folder_m2m_links[comic.pk] = {
+                folder_pks_map[path]
+                for parent in new_path.parents
+                if (path := str(parent)) in folder_pks_map
+            }
             updated_comics.append(comic)
         except Exception:
             self.log.exception(f"moving {comic.path}")
 
     def _bulk_comics_move_prepare(self):
         """Prepare Update Comics."""
-        comics = Comic.objects.filter(
-            library=self.library, path__in=self.task.files_moved.keys()
-        ).only("pk", "path", PARENT_FOLDER, FOLDERS_FIELD)
-
+        folder_pks_map = self._get_moved_comics_folder_pks_map()
         folder_m2m_links = {}
         updated_comics = []
-        for comic in comics.iterator():
-            self._prepare_moved_comic(comic, folder_m2m_links, updated_comics)
+        src_paths = tuple(self.task.files_moved.keys())
+        for start in range(0, len(src_paths), FILTER_BATCH_SIZE):
+            comics = Comic.objects.filter(
+                library=self.library,
+                path__in=src_paths[start : start + FILTER_BATCH_SIZE],
+            ).only("pk", "path", PARENT_FOLDER, FOLDERS_FIELD, *_MOVED_PRESAVE_FIELDS)
+            for comic in comics:
+                self._prepare_moved_comic(
+                    comic, folder_pks_map, folder_m2m_links, updated_comics
+                )
         self.task.files_moved = {}
         self.log.debug(f"Prepared {len(updated_comics)} for move...")
         return updated_comics, folder_m2m_links
@@ -80,12 +108,15 @@ class MovedImporter(AggregateMetadataImporter):
 
         # Prepare
         self._bulk_comics_moved_ensure_folders()
+        dest_paths = tuple(self.task.files_moved.values())
+        self.touch_comic_groups(self.task.files_moved.keys())
         updated_comics, folder_m2m_links = self._bulk_comics_move_prepare()
 
         # Update comics
         Comic.objects.bulk_update(updated_comics, MOVED_BULK_COMIC_UPDATE_FIELDS)
         if folder_m2m_links:
             self.bulk_fix_comic_m2m_field(FOLDERS_FIELD, folder_m2m_links, status)
+        self.touch_comic_groups(dest_paths)
 
         count = len(updated_comics)
         if count:
@@ -131,6 +162,7 @@ class MovedImporter(AggregateMetadataImporter):
                 unlink_groups.append(group)
             if unlink_groups:
                 model.objects.bulk_update(unlink_groups, ["custom_cover"])
+                self.touch_groups(model, (group.pk for group in unlink_groups))
                 self.log.debug(
                     f"Unlinked {len(unlink_groups)} {model.__name__} moved custom covers."
                 )
@@ -41,6 +41,11 @@ class LazyImportComicsTask(ImportTask):
     pks: frozenset[int]
 
 
+@dataclass
+class BackfillComicsTask:
+    """Backfill page counts and metadata for comics ingested stat only."""
+
+
 @dataclass
 class AdoptOrphanFoldersTask(ImportTask):
     """Move orphaned folders into a correct tree position."""
@@ -13,9 +13,11 @@ from codex.librarian.covers.coverd import CoverThread
 from codex.librarian.covers.tasks import CoverTask
 from codex.librarian.cron.crond import CronThread
 from codex.librarian.delayed_taskd import DelayedTasksThread
+from codex.librarian.importer.backfilld import ComicBackfillThread
 from codex.librarian.importer.importerd import ComicImporterThread
 from codex.librarian.importer.tasks import (
     AdoptOrphanFoldersTask,
+    BackfillComicsTask,
     ImportTask,
 )
 from codex.librarian.janitor.janitor import Janitor
@@ -54,6 +56,7 @@ class LibrarianDaemon(Process, LoggerBaseMixin):
         CoverThread,
         SearchIndexerThread,
         ComicImporterThread,
+        ComicBackfillThread,
         WatchdogEventBatcherThread,
         LibraryEventObserver,
         LibraryPollingObserver,
@@ -95,6 +98,8 @@ class LibrarianDaemon(Process, LoggerBaseMixin):
                 self._threads.bookmark_thread.queue.put(task)
             case WatchdogEventTask():
                 self._threads.watchdog_event_batcher_thread.queue.put(task)
+            case BackfillComicsTask():
+                self._threads.comic_backfill_thread.queue.put(task)
             case ImportTask():
                 self._threads.comic_importer_thread.queue.put(task)
             case NotifierTask():
@@ -38,7 +38,8 @@ class WatchdogEventBatcherThread(AggregateMessageQueuedThread):
         }
     )
     MAX_DELAY = 60
-    MAX_ITEMS_PER_GB = 50000
+    # The importer works in fixed size chunks so batch memory is just the paths.
+    MAX_ITEMS_PER_GB = 500000
 
     def __init__(self, *args, **kwargs):
         """Set the total items for limiting db ops per batch."""
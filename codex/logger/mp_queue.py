@@ -1,5 +1,6 @@
 """Central logging queue."""
 
-from multiprocessing import Queue
+from multiprocessing import get_context
 
-LOG_QUEUE = Queue()
+# Spawn context so spawned worker pools can log through it too.
+LOG_QUEUE = get_context("spawn").Queue()
@@ -35,7 +35,7 @@ class StatsPlatformSerializer(Serializer):
 
 
 class StatsConfigSerializer(Serializer):
-    """Config Information."""
+    """Config Information. Every field is also a config request choice."""
 
     library_count = IntegerField(required=False, read_only=True)
     user_anonymous_count = IntegerField(required=False, read_only=True)
@@ -43,6 +43,9 @@ class StatsConfigSerializer(Serializer):
     auth_group_count = IntegerField(required=False, read_only=True)
     # Only for api
     api_key = CharField(read_only=True, required=False)
+    # Only for the admin view of this server process
+    read_ahead_hits = IntegerField(required=False, read_only=True)
+    read_ahead_misses = IntegerField(required=False, read_only=True)
 
 
 class StatsSessionsSerializer(Serializer):
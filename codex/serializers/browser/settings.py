@@ -9,6 +9,7 @@ from rest_framework.serializers import (
 )
 
 from codex.choices.browser import BROWSER_ORDER_BY_CHOICES
+from codex.librarian.covers.path import COVER_SIZE_SUFFIXES
 from codex.serializers.browser.filters import BrowserSettingsFilterInputSerializer
 from codex.serializers.fields import TimestampField
 from codex.serializers.fields.browser import BreadcrumbsField, TopGroupField
@@ -48,6 +49,13 @@ class BrowserCoverInputSerializer(BrowserCoverInputSerializerBase):
     """Browser Settings for the cover response."""
 
     parent = SimpleRouteSerializer(required=False)
+    size = ChoiceField(choices=tuple(COVER_SIZE_SUFFIXES), required=False)
+
+
+class BrowserCoversInputSerializer(BrowserCoverInputSerializer):
+    """Browser Settings for the many covers response."""
+
+    groups = SimpleRouteSerializer(many=True, required=True)
 
 
 class BrowserSettingsSerializerBase(BrowserCoverInputSerializerBase):
@@ -52,6 +52,27 @@ MAX_CHUNK_SIZE = int(environ.get("CODEX_MAX_CHUNK_SIZE", "1000"))
 FILTER_BATCH_SIZE = int(environ.get("CODEX_FILTER_BATCH_SIZE", "900"))
 VITE_HOST = environ.get("VITE_HOST")
 SEARCH_INDEX_BATCH_SIZE = int(environ.get("CODEX_SEARCH_INDEX_BATCH_SIZE", "10000"))
+# Comics imported per chunk. Bounds importer memory and commits progress.
+IMPORT_CHUNK_SIZE = max(1, int(environ.get("CODEX_IMPORT_CHUNK_SIZE", "2000")))
+# Extracted metadata cache size cap in megabytes. 0 disables the cache.
+METADATA_CACHE_MAX_SIZE = (
+    int(environ.get("CODEX_METADATA_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
+# Imports creating more comics than this only read filenames and stat, then
+# backfill page counts and tags in the background. 0 disables.
+STAT_ONLY_INGEST_THRESHOLD = int(environ.get("CODEX_STAT_ONLY_INGEST_THRESHOLD", "0"))
+# Processes for bulk cover creation. 0 sizes the pool to the cpus.
+COVER_WORKERS = int(environ.get("CODEX_COVER_WORKERS", "0"))
+# Create cover thumbnails while the archive is open for tag extraction.
+IMPORT_COVERS = not_falsy_env("CODEX_IMPORT_COVERS")
+# Store cover thumbnails in a few large shard files instead of a file each.
+COVER_PACKS = not_falsy_env("CODEX_COVER_PACKS")
+# Create covers for new comics and landing pages in the background after imports.
+COVER_PREWARM = environ.get("CODEX_COVER_PREWARM") != "0"
+# Open comic archives kept for reading consecutive pages. 0 disables.
+ARCHIVE_POOL_SIZE = int(environ.get("CODEX_ARCHIVE_POOL_SIZE", "8"))
+# MiB of memory for pages decompressed ahead of readers. 0 disables.
+READ_AHEAD_CACHE_MB = int(environ.get("CODEX_READ_AHEAD_CACHE_MB", "64"))
 
 ####################################
 # Documented Environment Variables #
@@ -364,6 +385,13 @@ CACHES = {
         "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
         "LOCATION": str(DEFAULT_CACHE_PATH),
     },
+    # Dynamic cover pks per card. Small and many, so kept in memory.
+    "dynamic_covers": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "dynamic_covers",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
 }
 
 INTERNAL_IPS = ("127.0.0.1",)
@@ -1,9 +1,9 @@
 """codex:api:v3:browser URL Configuration."""
 
 from django.urls import path
-from django.views.decorators.cache import cache_control, cache_page, never_cache
+from django.views.decorators.cache import cache_page, never_cache
 
-from codex.urls.const import BROWSER_TIMEOUT, COVER_MAX_AGE, PAGE_MAX_AGE
+from codex.urls.const import BROWSER_TIMEOUT, PAGE_MAX_AGE
 from codex.views.browser.bookmark import BookmarkView
 from codex.views.browser.browser import BrowserView
 from codex.views.browser.choices import BrowserChoicesAvailableView, BrowserChoicesView
@@ -53,7 +53,7 @@ urlpatterns = [
     # Cover
     path(
         "<int_list:pks>/cover.webp",
-        cache_control(max_age=COVER_MAX_AGE, public=True)(CoverView.as_view()),
+        CoverView.as_view(),
         name="cover",
     ),
     #
@@ -3,6 +3,7 @@
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from codex.views.browser.covers import CoversView
 from codex.views.browser.mtime import MtimeView
 from codex.views.opds.urls import OPDSURLsView
 from codex.views.version import VersionView
@@ -14,6 +15,7 @@ urlpatterns = [
     path("c/", include("codex.urls.api.reader")),
     path("<group:group>/", include("codex.urls.api.browser")),
     path("mtime", MtimeView.as_view(), name="mtimes"),
+    path("covers", CoversView.as_view(), name="covers"),
     path("version", VersionView.as_view(), name="version"),
     path("admin/", include("codex.urls.api.admin")),
     path("schema", SpectacularAPIView.as_view(), name="schema"),
@@ -3,7 +3,7 @@
 from django.urls import path
 from django.views.decorators.cache import cache_control
 
-from codex.urls.const import COVER_MAX_AGE, PAGE_MAX_AGE
+from codex.urls.const import PAGE_MAX_AGE
 from codex.views.opds.binary import OPDSCoverView, OPDSDownloadView, OPDSPageView
 
 app_name = "bin"
@@ -21,7 +21,7 @@ urlpatterns = [
     # utilities
     path(
         "<str:group>/<int_list:pks>/cover.webp",
-        cache_control(max_age=COVER_MAX_AGE, public=True)(OPDSCoverView.as_view()),
+        OPDSCoverView.as_view(),
         name="cover",
     ),
     path(
@@ -9,6 +9,7 @@ from drf_spectacular.utils import extend_schema
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from codex.librarian.covers.manifest import COVER_MANIFEST
 from codex.librarian.mp_queue import LIBRARIAN_QUEUE
 from codex.librarian.notifier.tasks import LIBRARY_CHANGED_TASK
 from codex.librarian.tasks import DelayedTasks
@@ -17,7 +18,7 @@ from codex.librarian.watchdog.tasks import (
     WatchdogSyncTask,
 )
 from codex.logger.logger import get_logger
-from codex.models import FailedImport, Folder, Library
+from codex.models import Comic, CustomCover, FailedImport, Folder, Library
 from codex.serializers.admin.libraries import (
     AdminFolderListSerializer,
     AdminFolderSerializer,
@@ -93,6 +94,10 @@ class AdminLibraryViewSet(AdminModelViewSet):
         """Perform destroy and run hooks."""
         if instance.covers_only:
             raise NotSupportedError
+        # Record deleted pks so orphan cleanup purges their covers.
+        for model, custom in ((Comic, False), (CustomCover, True)):
+            pks = model.objects.filter(library=instance).values_list("pk", flat=True)
+            COVER_MANIFEST.add_deleted(pks.iterator(), custom)
         super().perform_destroy(instance)
         self._sync_watchdog()
         self._on_change()
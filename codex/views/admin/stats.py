@@ -16,6 +16,7 @@ from codex.serializers.admin.stats import (
     StatsSerializer,
 )
 from codex.views.admin.auth import AdminGenericAPIView
+from codex.views.reader.read_ahead import PAGE_READ_AHEAD
 
 LOG = get_logger(__name__)
 
@@ -53,7 +54,7 @@ class AdminStatsView(AdminGenericAPIView):
     def _add_api_key(self, obj):
         """Add the api key to the config object if specified."""
         request_counts = self.params.get("config", {})
-        if request_counts and ("apikey" not in request_counts):
+        if request_counts and ("api_key" not in request_counts):
             return
         api_key = Timestamp.objects.get(
             key=Timestamp.TimestampChoices.API_KEY.value
@@ -62,11 +63,25 @@ class AdminStatsView(AdminGenericAPIView):
             obj["config"] = {}
         obj["config"]["api_key"] = api_key
 
+    def _add_read_ahead(self, obj):
+        """Add the reader page read ahead counters if specified."""
+        if self.params and "config" not in self.params:
+            return
+        request_counts = self.params.get("config", {})
+        counters = {
+            "read_ahead_hits": PAGE_READ_AHEAD.hits,
+            "read_ahead_misses": PAGE_READ_AHEAD.misses,
+        }
+        for key, value in counters.items():
+            if not request_counts or key in request_counts:
+                obj.setdefault("config", {})[key] = value
+
     def get_object(self):
         """Get the stats object with an api key."""
         getter = CodexStats(self.params)
         obj = getter.get()
         self._add_api_key(obj)
+        self._add_read_ahead(obj)
         return obj
 
     @extend_schema(parameters=[input_serializer_class])
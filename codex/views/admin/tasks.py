@@ -10,6 +10,8 @@ from rest_framework.response import Response
 from codex.choices.notifications import Notifications
 from codex.librarian.covers.tasks import (
     CoverCreateAllTask,
+    CoverPackCompactTask,
+    CoverPackMigrateTask,
     CoverRemoveAllTask,
     CoverRemoveOrphansTask,
 )
@@ -75,6 +77,8 @@ _TASK_MAP = MappingProxyType(
     {
         "purge_comic_covers": CoverRemoveAllTask(),
         "create_all_comic_covers": CoverCreateAllTask(),
+        "pack_covers": CoverPackMigrateTask(),
+        "compact_cover_packs": CoverPackCompactTask(),
         "search_index_update": SearchIndexUpdateTask(rebuild=False),
         "search_index_rebuild": SearchIndexUpdateTask(rebuild=True),
         "search_index_remove_stale": SearchIndexRemoveStaleTask(),
@@ -1,31 +1,54 @@
 """Comic cover thumbnail view."""
 
+import json
+from hashlib import blake2b
+
+from django.core.cache import caches
 from django.db import OperationalError
+from django.db.models import F, Max, OrderBy, Window
+from django.db.models.functions import RowNumber
 from django.db.models.query import Q
-from django.http.response import StreamingHttpResponse
+from django.http.response import FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
 from rest_framework.renderers import BaseRenderer
 
 from codex.librarian.covers.create import CoverCreateThread
-from codex.librarian.covers.path import CoverPathMixin
+from codex.librarian.covers.path import (
+    COVER_PROFILE_FAST,
+    COVER_SIZE_1X,
+    CoverPathMixin,
+)
+from codex.librarian.covers.tasks import CoverReencodeTask
 from codex.librarian.mp_queue import LIBRARIAN_QUEUE
 from codex.logger.logger import get_logger
-from codex.models import Comic, Volume
+from codex.models import Comic, Library, StoryArc, Volume
 from codex.models.groups import Folder
 from codex.models.paths import CustomCover
 from codex.serializers.browser.settings import BrowserCoverInputSerializer
+from codex.urls.const import COVER_MAX_AGE
 from codex.views.browser.annotate.order import BrowserAnnotateOrderView
 from codex.views.const import (
     CUSTOM_COVER_GROUP_RELATION,
+    FILTER_ONLY_GROUP_RELATION,
     GROUP_RELATION,
     MISSING_COVER_FN,
     MISSING_COVER_NAME_MAP,
     STATIC_IMG_PATH,
 )
-from codex.views.util import chunker
+from codex.views.util import DEFAULT_CHUNK_SIZE
 
 LOG = get_logger(__name__)
+_DYNAMIC_COVER_CACHE = caches["dynamic_covers"]
+# Params that don't choose the dynamic cover.
+_DYNAMIC_COVER_KEY_IGNORE_PARAMS = frozenset({"size", "show", "breadcrumbs"})
+_BOOKMARK_ORDER_BYS = frozenset({"bookmark_updated_at"})
+# Covers with a ts cache buster never change at the same url.
+_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+# The browser sends millisecond timestamps, OPDS sends seconds.
+_MAX_SECONDS_TS = 10**11
 
 
 class WEBPRenderer(BaseRenderer):
@@ -59,7 +82,8 @@ class CoverView(BrowserAnnotateOrderView):
 
         # First cover group filter relies on sort names to look outside the browser supplied pks
         # For multi_groups not in the browser query.
-        pks = self.kwargs["pks"]
+        if pks is None:
+            pks = self.kwargs["pks"]
         if not self.model:
             qs = Comic.objects.none()
         else:
@@ -78,26 +102,83 @@ class CoverView(BrowserAnnotateOrderView):
         pks = self.kwargs["pks"]
         return pks[0], False
 
-    def _get_custom_cover(self):
-        """Get Custom Cover."""
+    def _get_custom_cover_filter(self, pks):
+        """Get the custom cover filter for the group or None."""
         if self.model is Volume or not self.params.get("custom_covers"):
             return None
         group = self.kwargs["group"]
         group_rel = CUSTOM_COVER_GROUP_RELATION[group]
-        pks = self.kwargs["pks"]
-        comic_filter = {f"{group_rel}__in": pks}
+        return group_rel, {f"{group_rel}__in": pks}
+
+    def _get_custom_cover(self):
+        """Get Custom Cover."""
+        custom_cover_filter = self._get_custom_cover_filter(self.kwargs["pks"])
+        if not custom_cover_filter:
+            return None
+        _, comic_filter = custom_cover_filter
         qs = CustomCover.objects.filter(**comic_filter)
         qs = qs.only("pk")
         return qs.first()
 
+    def _get_acl_scope(self):
+        """Get who else sees the same dynamic cover."""
+        user = self.request.user
+        if self.params.get("filters", {}).get("bookmark") or (
+            self.params.get("order_by") in _BOOKMARK_ORDER_BYS
+        ):
+            # My bookmarks choose the cover.
+            if user and user.is_authenticated:
+                return f"user:{user.pk}"
+            return f"session:{self.request.session.session_key}"
+        if not user or not user.is_authenticated:
+            return "anon"
+        # Library visibility only depends on group membership.
+        group_pks = user.groups.order_by("pk").values_list("pk", flat=True)
+        return "groups:" + ",".join(map(str, group_pks))
+
+    def _get_dynamic_cover_cache_key(self):
+        """Get the dynamic cover cache key, or None if it can't be cached."""
+        ts = self.request.GET.get("ts", "")
+        if not ts:
+            # Without the mtime cache buster, the group's comics may have changed.
+            return None
+        library_changed = Library.objects.aggregate(updated_at=Max("updated_at"))[
+            "updated_at"
+        ]
+        filters = {
+            key: value
+            for key, value in self.params.items()
+            if key not in _DYNAMIC_COVER_KEY_IGNORE_PARAMS
+        }
+        filters_json = json.dumps(
+            (self.kwargs["pks"], filters), sort_keys=True, default=str
+        )
+        filters_hash = blake2b(filters_json.encode(), digest_size=16).hexdigest()
+        return ":".join(
+            (
+                self.kwargs["group"],
+                str(self.params.get("order_by")),
+                str(self.params.get("order_reverse")),
+                self._get_acl_scope(),
+                filters_hash,
+                ts,
+                library_changed.isoformat() if library_changed else "",
+            )
+        )
+
     def _get_dynamic_cover(self):
         """Get dynamic cover."""
+        cache_key = self._get_dynamic_cover_cache_key()
+        if cache_key and (cover_pk := _DYNAMIC_COVER_CACHE.get(cache_key)) is not None:
+            return cover_pk, False
         comic_qs = self.get_filtered_queryset(Comic)
         comic_qs = self.annotate_order_aggregates(comic_qs)
         comic_qs = self.add_order_by(comic_qs)
         comic_qs = comic_qs.only("pk")
         comic = comic_qs.first()
         cover_pk = comic.pk if comic else 0
+        if cache_key:
+            _DYNAMIC_COVER_CACHE.set(cache_key, cover_pk)
         return cover_pk, False
 
     def _get_cover_pk(self) -> tuple[int, bool]:
@@ -111,6 +192,112 @@ class CoverView(BrowserAnnotateOrderView):
             cover_pk, custom = self._get_dynamic_cover()
         return cover_pk, custom
 
+    def _get_custom_covers(self, pks_list):
+        """Get the first custom cover pk of each card in one query."""
+        custom_cover_filter = self._get_custom_cover_filter(self.kwargs["pks"])
+        if not custom_cover_filter:
+            return {}
+        group_rel, comic_filter = custom_cover_filter
+        qs = CustomCover.objects.filter(**comic_filter)
+        group_custom_cover_pks = {}
+        for custom_cover_pk, group_pk in qs.order_by("pk").values_list("pk", group_rel):
+            group_custom_cover_pks.setdefault(group_pk, custom_cover_pk)
+        custom_covers = {}
+        for index, pks in enumerate(pks_list):
+            if custom_cover_pks := [
+                group_custom_cover_pks[pk] for pk in pks if pk in group_custom_cover_pks
+            ]:
+                custom_covers[index] = min(custom_cover_pks)
+        return custom_covers
+
+    def _get_cover_partition(self, pks_list):
+        """Get the comic relation that partitions covers and each card's keys."""
+        if self.params.get("dynamic_covers") or self.model in (Volume, Folder):
+            group_rel = FILTER_ONLY_GROUP_RELATION[self.model_group]
+            return group_rel, [frozenset(pks) for pks in pks_list]
+        # First covers are shared by groups with the same sort name.
+        group_rel = GROUP_RELATION[self.model_group]
+        qs = self.model.objects.filter(pk__in=self.kwargs["pks"])  # type: ignore[reportOptionalMemberAccess]
+        sort_names = dict(qs.values_list("pk", "sort_name"))
+        card_keys = [
+            frozenset(sort_names[pk] for pk in pks if pk in sort_names)
+            for pks in pks_list
+        ]
+        return f"{group_rel}__sort_name", card_keys
+
+    def _get_dynamic_covers_by_key(self, partition_rel):
+        """Get the first comic pk for each partition in one windowed query."""
+        comic_qs = self.get_filtered_queryset(Comic)
+        comic_qs = self.annotate_order_aggregates(comic_qs)
+        order_by = self.add_order_by(comic_qs).query.order_by
+        rank = Window(
+            RowNumber(),
+            partition_by=F("cover_key"),
+            order_by=[
+                OrderBy(F(field.removeprefix("-")), descending=field.startswith("-"))
+                for field in order_by
+            ],
+        )
+        comic_qs = comic_qs.annotate(cover_key=F(partition_rel)).annotate(
+            cover_rank=rank
+        )
+        comic_qs = comic_qs.filter(cover_rank=1).order_by()
+        return dict(comic_qs.values_list("cover_key", "pk"))
+
+    def _get_card_dynamic_cover(self, pks):
+        """Get one card's dynamic cover on its own."""
+        union_pks = self.kwargs["pks"]
+        self.kwargs["pks"] = pks
+        try:
+            cover_pk, _ = self._get_dynamic_cover()
+        finally:
+            self.kwargs["pks"] = union_pks
+        return cover_pk
+
+    def _get_dynamic_covers(self, pks_list):
+        """Get the first comic pk of each card."""
+        if self.model is StoryArc and self.order_key == "story_arc_number":
+            # Each card orders by its own story arc's numbers.
+            return {
+                index: self._get_card_dynamic_cover(pks)
+                for index, pks in enumerate(pks_list)
+            }
+        partition_rel, card_keys = self._get_cover_partition(pks_list)
+        key_covers = self._get_dynamic_covers_by_key(partition_rel)
+        dynamic_covers = {}
+        for index, (pks, keys) in enumerate(zip(pks_list, card_keys, strict=True)):
+            if len(keys) == 1:
+                (key,) = keys
+                dynamic_covers[index] = key_covers.get(key, 0)
+            else:
+                # Cards of many partitions are rare enough to query alone.
+                dynamic_covers[index] = self._get_card_dynamic_cover(pks)
+        return dynamic_covers
+
+    def get_cover_pks(self, pks_list):
+        """Get the cover pk of many cards of this view's group at once."""
+        if self.model is Comic:
+            return [(pks[0] if pks else 0, False) for pks in pks_list]
+        custom_covers = self._get_custom_covers(pks_list)
+        dynamic_indexes = [
+            index for index in range(len(pks_list)) if index not in custom_covers
+        ]
+        dynamic_covers = {}
+        if dynamic_indexes:
+            dynamic_pks = self._get_dynamic_covers(
+                [pks_list[index] for index in dynamic_indexes]
+            )
+            dynamic_covers = {
+                index: dynamic_pks.get(dynamic_index, 0)
+                for dynamic_index, index in enumerate(dynamic_indexes)
+            }
+        return [
+            (custom_covers[index], True)
+            if index in custom_covers
+            else (dynamic_covers[index], False)
+            for index in range(len(pks_list))
+        ]
+
     def _get_missing_cover_path(self):
         """Get the missing cover, which is a default svg if fetched for a group."""
         group: str = self.kwargs["group"]
@@ -124,22 +311,71 @@ class CoverView(BrowserAnnotateOrderView):
         cover_path = STATIC_IMG_PATH / cover_fn
         return cover_path, content_type
 
-    def _get_cover_data(self, pk, custom):
-        thumb_buffer = None
-        content_type = "image/webp"
+    def _get_cover_file(self, pk, custom):
+        """Get the cached or newly created cover or None if it's missing."""
+        size = self.params.get("size", COVER_SIZE_1X)
 
-        cover_path = CoverPathMixin.get_cover_path(pk, custom)
-        if not cover_path.exists():
-            thumb_buffer = CoverCreateThread.create_cover_from_path(
-                pk, cover_path, LOG, LIBRARIAN_QUEUE, custom
+        cover = CoverPathMixin.open_cover(pk, custom, size=size)
+        if not cover and (
+            cover := CoverPathMixin.open_cover(pk, custom, COVER_PROFILE_FAST, size)
+        ):
+            # Re-encode tasks are deduplicated and may have been lost to a restart.
+            LIBRARIAN_QUEUE.put(CoverReencodeTask(pk, custom))
+        if not cover:
+            return CoverCreateThread.create_cover_from_path(
+                pk, LOG, LIBRARIAN_QUEUE, custom, size
             )
-            if not thumb_buffer:
+
+        cover_file, length = cover
+        if not length:
+            # zero length is code for missing.
+            cover_file.close()
+            return None
+        return cover_file
+
+    def get_covers(self, pks_list):
+        """Get the cover data, content type and if it's missing for many cards."""
+        try:
+            cover_pks = self.get_cover_pks(pks_list)
+        except OperationalError as exc:
+            self._handle_operational_error(exc)
+            cover_pks = [(0, False)] * len(pks_list)
+        covers = []
+        for pk, custom in cover_pks:
+            if cover_file := self._get_cover_file(pk, custom):
+                content_type = self.content_type
+                missing = False
+            else:
                 cover_path, content_type = self._get_missing_cover_path()
-        elif cover_path.stat().st_size == 0:
-            cover_path, content_type = self._get_missing_cover_path()
+                cover_file = cover_path.open("rb")
+                missing = True
+            with cover_file:
+                covers.append((cover_file.read(), content_type, missing))
+        return covers
 
-        cover_file = thumb_buffer if thumb_buffer else cover_path.open("rb")
-        return cover_file, content_type
+    def _get_cache_validators(self):
+        """Get validators from the ts cache buster without touching the disk."""
+        ts = self.request.GET.get("ts", "")
+        if not (ts.isascii() and ts.isdecimal()):
+            return None, None
+        seconds = int(ts)
+        if seconds > _MAX_SECONDS_TS:
+            seconds //= 1000
+        # Weak, because fast and best profile covers look the same.
+        return f'W/"{ts}"', seconds
+
+    @staticmethod
+    def _set_cache_headers(response, etag, last_modified):
+        """Cache covers with a cache buster forever, others for a while."""
+        if etag:
+            response.headers["ETag"] = etag
+            response.headers["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(
+                response, public=True, max_age=_IMMUTABLE_MAX_AGE, immutable=True
+            )
+        else:
+            patch_cache_control(response, public=True, max_age=COVER_MAX_AGE)
+        return response
 
     @extend_schema(
         parameters=[BrowserAnnotateOrderView.input_serializer_class],
@@ -147,6 +383,13 @@ class CoverView(BrowserAnnotateOrderView):
     )
     def get(self, *args, **kwargs):
         """Get comic cover."""
+        etag, last_modified = self._get_cache_validators()
+        if etag and (
+            response := get_conditional_response(
+                self.request, etag=etag, last_modified=last_modified
+            )
+        ):
+            return self._set_cache_headers(response, etag, last_modified)
         try:
             try:
                 pk, custom = self._get_cover_pk()
@@ -154,7 +397,19 @@ class CoverView(BrowserAnnotateOrderView):
                 self._handle_operational_error(exc)
                 pk = 0
                 custom = False
-            cover_file, content_type = self._get_cover_data(pk, custom)
-            return StreamingHttpResponse(chunker(cover_file), content_type=content_type)
+            if cover_file := self._get_cover_file(pk, custom):
+                content_type = self.content_type
+                filename = "cover.webp"
+            else:
+                # Missing covers may be created later at the same url.
+                etag = None
+                cover_path, content_type = self._get_missing_cover_path()
+                cover_file = cover_path.open("rb")
+                filename = cover_path.name
+            response = FileResponse(
+                cover_file, content_type=content_type, filename=filename
+            )
+            response.block_size = DEFAULT_CHUNK_SIZE
+            return self._set_cache_headers(response, etag, last_modified)
         except Exception:
             LOG.exception("Get cover")
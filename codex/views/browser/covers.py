@@ -0,0 +1,114 @@
+"""Many comic cover thumbnails in one response."""
+
+import json
+from struct import Struct
+
+from django.http.response import HttpResponse
+from django.utils.cache import get_conditional_response
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework.renderers import BaseRenderer
+
+from codex.logger.logger import get_logger
+from codex.serializers.browser.settings import BrowserCoversInputSerializer
+from codex.views.browser.cover import CoverView
+
+LOG = get_logger(__name__)
+# The packed response starts with the byte length of its json index.
+_INDEX_LENGTH = Struct(">I")
+
+
+class PackedCoversRenderer(BaseRenderer):
+    """Render packed covers."""
+
+    media_type = "application/octet-stream"
+    format = "bin"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, *_args, **_kwargs):
+        """Return raw data."""
+        return data
+
+
+class CoversView(CoverView):
+    """
+    Comic cover thumbnails for many groups in one response.
+
+    The response is the index length as a big endian uint32, a json index of
+    the offset, length and content type of each group's cover in request
+    order, and then the covers.
+    """
+
+    input_serializer_class = BrowserCoversInputSerializer
+    renderer_classes = (PackedCoversRenderer,)
+    content_type = PackedCoversRenderer.media_type
+    REPARSE_JSON_FIELDS = frozenset(CoverView.REPARSE_JSON_FIELDS | {"groups"})
+
+    def _get_group_view(self, group, pks_list):
+        """Get a cover view for all the cards of one group."""
+        if any(not pks for pks in pks_list):
+            union_pks = ()
+        else:
+            union_pks = tuple(sorted({pk for pks in pks_list for pk in pks}))
+        view = CoverView()
+        view.setup(self.request, group=group, pks=union_pks)
+        return view
+
+    def _get_covers(self):
+        """Get the covers in request order."""
+        group_indexes = {}
+        for index, route in enumerate(self.params["groups"]):
+            group_indexes.setdefault(route["group"], []).append((index, route["pks"]))
+        covers = [None] * len(self.params["groups"])
+        for group, indexes in group_indexes.items():
+            pks_list = [pks for _, pks in indexes]
+            view = self._get_group_view(group, pks_list)
+            group_covers = view.get_covers(pks_list)
+            for (index, _), cover in zip(indexes, group_covers, strict=True):
+                covers[index] = cover
+        return covers
+
+    @staticmethod
+    def _pack_covers(covers):
+        """Pack the covers behind their index."""
+        index = []
+        offset = 0
+        for data, content_type, _ in covers:
+            index.append(
+                {"offset": offset, "length": len(data), "contentType": content_type}
+            )
+            offset += len(data)
+        index_json = json.dumps(index, separators=(",", ":")).encode()
+        return b"".join(
+            (
+                _INDEX_LENGTH.pack(len(index_json)),
+                index_json,
+                *(data for data, _, _ in covers),
+            )
+        )
+
+    @extend_schema(
+        parameters=[input_serializer_class],
+        responses={(200, content_type): OpenApiTypes.BINARY},
+    )
+    def get(self, *args, **kwargs):
+        """Get many comic covers."""
+        etag, last_modified = self._get_cache_validators()
+        if etag and (
+            response := get_conditional_response(
+                self.request, etag=etag, last_modified=last_modified
+            )
+        ):
+            return self._set_cache_headers(response, etag, last_modified)
+        try:
+            covers = self._get_covers()
+            if any(missing for _, _, missing in covers):
+                # Missing covers may be created later at the same url.
+                etag = None
+            response = HttpResponse(
+                self._pack_covers(covers), content_type=self.content_type
+            )
+            return self._set_cache_headers(response, etag, last_modified)
+        except Exception:
+            LOG.exception("Get covers")
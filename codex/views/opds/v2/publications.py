@@ -5,7 +5,12 @@ from math import floor
 from types import MappingProxyType
 from urllib.parse import quote_plus
 
-from codex.librarian.covers.create import THUMBNAIL_HEIGHT, THUMBNAIL_WIDTH
+from codex.librarian.covers.create import (
+    COVER_SIZE_DIMENSIONS,
+    THUMBNAIL_HEIGHT,
+    THUMBNAIL_WIDTH,
+)
+from codex.librarian.covers.path import COVER_SIZE_2X
 from codex.models import Comic
 from codex.settings.settings import FALSY
 from codex.views.opds.const import AUTHOR_ROLES, MimeType, Rel
@@ -59,9 +64,15 @@ class OPDS2PublicationView(OPDS2TopLinksView):
 
         image_link = self.link(link_data)
 
+        # HiDPI variant
+        href_data.query_params = {**query_params, "size": COVER_SIZE_2X}
+        link_data.width, link_data.height = COVER_SIZE_DIMENSIONS[COVER_SIZE_2X]
+        image_2x_link = self.link(link_data)
+
         return [
             cover_link,
             image_link,
+            image_2x_link,
         ]
 
     @staticmethod
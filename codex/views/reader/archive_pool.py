@@ -0,0 +1,202 @@
+"""Open comic archives shared by page requests."""
+
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from struct import Struct
+from threading import Lock, Timer
+from time import monotonic
+from zipfile import ZIP_STORED, ZipInfo
+
+from comicbox.box import Comicbox
+
+from codex.models.comic import FileType
+from codex.settings.settings import ARCHIVE_POOL_SIZE
+
+# Close archives no one has read a page from in this long.
+_IDLE_TIMEOUT = 60.0
+# Zip local file header signature, then the file name and extra field lengths.
+_ZIP_LOCAL_HEADER = Struct("<4s22xHH")
+_ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+_ZIP_ENCRYPTED_FLAG = 0x1
+
+
+class _ArchiveEntry:
+    """One pooled archive."""
+
+    __slots__ = ("box", "closed", "last_used", "lock", "mtime", "stored_ranges")
+
+    def __init__(self, mtime):
+        """Initialize an unopened archive."""
+        self.box = None
+        self.closed = False
+        self.last_used = 0.0
+        self.lock = Lock()
+        self.mtime = mtime
+        # page index -> (offset, length) or None
+        self.stored_ranges = {}
+
+    def close(self):
+        """Close the archive after any reader is done with it."""
+        with self.lock:
+            if self.box:
+                self.box.close()
+                self.box = None
+            self.closed = True
+
+
+class ComicArchivePool:
+    """LRU of open comic archives with their parsed page lists."""
+
+    def __init__(self, max_size, idle_timeout=_IDLE_TIMEOUT):
+        """Initialize the pool."""
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._timer = None
+
+    def _pop_idle(self, now):
+        """Remove entries that haven't been used recently."""
+        idle = []
+        while self._entries:
+            path, entry = next(iter(self._entries.items()))
+            if now - entry.last_used < self._idle_timeout:
+                break
+            idle.append(entry)
+            del self._entries[path]
+        return idle
+
+    def _schedule_close_idle(self):
+        """Close idle archives later, even if no more pages are read."""
+        if self._timer is None and self._entries:
+            self._timer = Timer(self._idle_timeout, self._close_idle)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _close_idle(self):
+        with self._lock:
+            self._timer = None
+            idle = self._pop_idle(monotonic())
+            self._schedule_close_idle()
+        for entry in idle:
+            entry.close()
+
+    def _check_out(self, path, mtime):
+        """Get the entry for the path, evicting stale and old entries."""
+        now = monotonic()
+        with self._lock:
+            closing = self._pop_idle(now)
+            entry = self._entries.get(path)
+            if entry is None or entry.mtime != mtime:
+                if entry:
+                    closing.append(entry)
+                entry = self._entries[path] = _ArchiveEntry(mtime)
+            self._entries.move_to_end(path)
+            entry.last_used = now
+            while len(self._entries) > self._max_size:
+                closing.append(self._entries.popitem(last=False)[1])
+            self._schedule_close_idle()
+        for closing_entry in closing:
+            closing_entry.close()
+        return entry
+
+    @contextmanager
+    def _open_entry(self, path):
+        """Yield the pool entry, if there is one, and its open archive."""
+        if self._max_size <= 0:
+            with Comicbox(path) as box:
+                yield None, box
+            return
+        path = str(path)
+        entry = self._check_out(path, Path(path).stat().st_mtime_ns)
+        with entry.lock:
+            if entry.closed:
+                # Evicted while waiting for another reader.
+                with Comicbox(path) as box:
+                    yield None, box
+                return
+            if entry.box is None:
+                entry.box = Comicbox(path).__enter__()
+            try:
+                yield entry, entry.box
+            except Exception:
+                # Don't reuse an archive that may be in a bad state.
+                entry.box.close()
+                entry.box = None
+                raise
+            finally:
+                entry.last_used = monotonic()
+
+    @contextmanager
+    def open(self, path):
+        """Open a comic archive, reusing an already open one."""
+        with self._open_entry(path) as (_, box):
+            yield box
+
+    @staticmethod
+    def _get_stored_range(box, path, index):
+        """Get the file byte range of a page stored uncompressed in a zip."""
+        if box.get_file_type() != FileType.CBZ.value:
+            return None
+        pagename = box.get_pagename(index)
+        info = next(
+            (info for info in box.infolist() if info.filename == pagename), None
+        )
+        if (
+            not isinstance(info, ZipInfo)
+            or info.compress_type != ZIP_STORED
+            or info.flag_bits & _ZIP_ENCRYPTED_FLAG
+        ):
+            return None
+        # The local header's extra field may differ from the central directory's.
+        with Path(path).open("rb") as archive_file:
+            header = os.pread(
+                archive_file.fileno(), _ZIP_LOCAL_HEADER.size, info.header_offset
+            )
+        if len(header) != _ZIP_LOCAL_HEADER.size:
+            return None
+        signature, filename_length, extra_length = _ZIP_LOCAL_HEADER.unpack(header)
+        if signature != _ZIP_LOCAL_HEADER_SIGNATURE:
+            return None
+        offset = (
+            info.header_offset + _ZIP_LOCAL_HEADER.size + filename_length + extra_length
+        )
+        return offset, info.file_size
+
+    def _get_entry_stored_range(self, entry, box, path, index):
+        """Get a stored range, remembering it if the archive is pooled."""
+        if entry is None:
+            return self._get_stored_range(box, path, index)
+        if index not in entry.stored_ranges:
+            entry.stored_ranges[index] = self._get_stored_range(box, path, index)
+        return entry.stored_ranges[index]
+
+    def get_page(self, path, index, *, to_pixmap=False, get_cached=None):
+        """
+        Get a page's byte range if it isn't compressed, or else its data.
+
+        Both come from one open archive. get_cached is tried before
+        decompressing the page.
+        """
+        with self._open_entry(path) as (entry, box):
+            if not to_pixmap and (
+                stored_range := self._get_entry_stored_range(entry, box, path, index)
+            ):
+                return stored_range, None
+            data = get_cached() if get_cached else None
+            if data is None:
+                data = box.get_page_by_index(index, to_pixmap=to_pixmap)
+            return None, data
+
+    def clear(self):
+        """Close every archive."""
+        with self._lock:
+            entries = tuple(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.close()
+
+
+COMIC_ARCHIVE_POOL = ComicArchivePool(ARCHIVE_POOL_SIZE)
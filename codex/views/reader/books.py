@@ -27,6 +27,7 @@ _COMIC_FIELDS = (
     "issue_number",
     "issue_suffix",
     "page_count",
+    "path",
     "series",
     "volume",
     "reading_direction",
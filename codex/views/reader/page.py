@@ -1,8 +1,8 @@
 """Views for reading comic books."""
 
+from functools import partial
 from io import BytesIO
 
-from comicbox.box import Comicbox
 from django.http.response import StreamingHttpResponse
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema
@@ -16,7 +16,9 @@ from codex.models.comic import Comic, FileType
 from codex.settings.settings import FALSY
 from codex.views.auth import AuthFilterAPIView
 from codex.views.bookmark import BookmarkAuthMixin
-from codex.views.util import chunker
+from codex.views.reader.archive_pool import COMIC_ARCHIVE_POOL
+from codex.views.reader.read_ahead import PAGE_READ_AHEAD
+from codex.views.util import chunker, range_chunker
 
 LOG = get_logger(__name__)
 _PDF_MIME_TYPE = "application/pdf"
@@ -50,12 +52,13 @@ class ReaderPageView(BookmarkAuthMixin, AuthFilterAPIView):
     content_type = "image/jpeg"
     content_negotiation_class = IgnoreClientContentNegotiation  # type: ignore[reportAssignmentType]
 
+    def _is_prefetch(self):
+        """Return if the browser is only prefetching the page."""
+        return self.request.headers.get("X-moz") in self.X_MOZ_PRE_HEADERS
+
     def _update_bookmark(self):
         """Update the bookmark if the bookmark param was passed."""
-        do_bookmark = bool(
-            self.request.GET.get("bookmark")
-            and self.request.headers.get("X-moz") not in self.X_MOZ_PRE_HEADERS
-        )
+        do_bookmark = bool(self.request.GET.get("bookmark") and not self._is_prefetch())
         if not do_bookmark:
             return
 
@@ -67,21 +70,46 @@ class ReaderPageView(BookmarkAuthMixin, AuthFilterAPIView):
         task = BookmarkUpdateTask(auth_filter, comic_pks, updates)
         LIBRARIAN_QUEUE.put(task)
 
+    @staticmethod
+    def _get_page_content(comic, page, to_pixmap):
+        """Get an iterator over the page data and its length."""
+        if comic.file_type == FileType.CBZ.value:
+            stored_range, page_image = COMIC_ARCHIVE_POOL.get_page(
+                comic.path,
+                page,
+                to_pixmap=to_pixmap,
+                get_cached=partial(PAGE_READ_AHEAD.get, comic.path, page, to_pixmap),
+            )
+            if stored_range:
+                # Serve uncompressed zip pages straight from the archive file.
+                offset, length = stored_range
+                chunks = range_chunker(comic.path, offset, length, _PAGE_CHUNK_SIZE)
+                return chunks, length
+        else:
+            page_image = PAGE_READ_AHEAD.get(comic.path, page, to_pixmap)
+            if page_image is None:
+                with COMIC_ARCHIVE_POOL.open(comic.path) as cb:
+                    page_image = cb.get_page_by_index(page, to_pixmap=to_pixmap)
+        if not page_image:
+            page_image = b""
+        return chunker(BytesIO(page_image), _PAGE_CHUNK_SIZE), len(page_image)
+
     def _get_page_image(self):
-        """Get the image data and content type."""
+        """Get the image data, its length and content type."""
         # Get comic - Distinct is important
         group_acl_filter = self.get_group_acl_filter(Comic, self.request.user)
-        qs = Comic.objects.filter(group_acl_filter).only("path", "file_type").distinct()
+        qs = Comic.objects.filter(group_acl_filter)
+        qs = qs.only("path", "file_type", "page_count").distinct()
         pk = self.kwargs.get("pk")
         comic = qs.get(pk=pk)
 
         # page_image
         page = self.kwargs.get("page")
         to_pixmap = self.request.GET.get("pixmap", "").lower() not in FALSY
-        with Comicbox(comic.path) as cb:
-            page_image = cb.get_page_by_index(page, to_pixmap=to_pixmap)
-        if not page_image:
-            page_image = b""
+        page_content, length = self._get_page_content(comic, page, to_pixmap)
+        if not self._is_prefetch():
+            # Prefetched pages are guesses, don't read ahead of them.
+            PAGE_READ_AHEAD.read_ahead(comic.path, page, comic.page_count, to_pixmap)
 
         # content type
         if comic.file_type == FileType.PDF.value and not to_pixmap:
@@ -89,7 +117,7 @@ class ReaderPageView(BookmarkAuthMixin, AuthFilterAPIView):
         else:
             content_type = self.content_type
 
-        return page_image, content_type
+        return page_content, length, content_type
 
     @extend_schema(
         parameters=[
@@ -104,7 +132,7 @@ class ReaderPageView(BookmarkAuthMixin, AuthFilterAPIView):
     def get(self, *_args, **_kwargs):
         """Get the comic page from the archive."""
         try:
-            page_image, content_type = self._get_page_image()
+            page_content, length, content_type = self._get_page_image()
             self._update_bookmark()
         except Comic.DoesNotExist as exc:
             pk = self.kwargs.get("pk")
@@ -118,5 +146,6 @@ class ReaderPageView(BookmarkAuthMixin, AuthFilterAPIView):
             LOG.warning(exc)
             raise NotFound(detail="comic page not found") from exc
         else:
-            page_chunker = chunker(BytesIO(page_image), _PAGE_CHUNK_SIZE)
-            return StreamingHttpResponse(page_chunker, content_type=content_type)
+            response = StreamingHttpResponse(page_content, content_type=content_type)
+            response["Content-Length"] = length
+            return response
@@ -0,0 +1,145 @@
+"""Decompress the pages readers will likely read next."""
+
+from collections import OrderedDict
+from pathlib import Path
+from threading import Condition, Thread
+
+from codex.logger.logger import get_logger
+from codex.settings.settings import READ_AHEAD_CACHE_MB
+from codex.views.reader.archive_pool import COMIC_ARCHIVE_POOL
+
+LOG = get_logger(__name__)
+# Pages to decompress ahead of the page being read.
+_READ_AHEAD_PAGES = 4
+# Remember the last page and next book of this many comics.
+_PATHS_MAX_SIZE = 256
+# Drop the oldest waiting pages when readers outpace the worker.
+_PENDING_MAX_SIZE = 64
+
+
+class PageReadAhead:
+    """Size capped LRU of pages decompressed before readers ask for them."""
+
+    def __init__(self, max_bytes, pages=_READ_AHEAD_PAGES):
+        """Initialize the cache and worker state."""
+        self._max_bytes = max_bytes
+        self._pages = pages
+        self._lock = Condition()
+        # (path, page, to_pixmap) -> (mtime, data)
+        self._cache = OrderedDict()
+        self._size = 0
+        self._pending = OrderedDict()
+        self._positions = OrderedDict()
+        self._next_books = OrderedDict()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _remember(lru, key, value):
+        lru[key] = value
+        lru.move_to_end(key)
+        while len(lru) > _PATHS_MAX_SIZE:
+            lru.popitem(last=False)
+
+    def set_next_book(self, path, next_path):
+        """Read ahead into the next book after the last pages."""
+        if self._max_bytes <= 0:
+            return
+        with self._lock:
+            self._remember(self._next_books, str(path), str(next_path))
+
+    def get(self, path, page, to_pixmap):
+        """Get a page if it was read ahead."""
+        if self._max_bytes <= 0:
+            return None
+        key = (str(path), page, to_pixmap)
+        mtime = Path(path).stat().st_mtime_ns
+        with self._lock:
+            if entry := self._cache.get(key):
+                if entry[0] == mtime:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._size -= len(entry[1])
+                del self._cache[key]
+            self.misses += 1
+        return None
+
+    def _get_keys(self, path, page, page_count, to_pixmap):
+        """Get the pages ahead in the direction the reader is paging."""
+        last_page = self._positions.get(path)
+        self._remember(self._positions, path, page)
+        keys = []
+        if last_page is not None and page < last_page:
+            start = max(page - self._pages, 0)
+            keys.extend(
+                (path, index, to_pixmap) for index in range(page - 1, start - 1, -1)
+            )
+            return keys
+        stop = page + 1 + self._pages
+        end = min(stop, page_count) if page_count else stop
+        keys.extend((path, index, to_pixmap) for index in range(page + 1, end))
+        if page_count and (next_path := self._next_books.get(path)):
+            remaining = min(stop - page_count, self._pages)
+            keys.extend((next_path, index, to_pixmap) for index in range(remaining))
+        return keys
+
+    def read_ahead(self, path, page, page_count, to_pixmap):
+        """Queue the pages after this one for the worker."""
+        if self._max_bytes <= 0:
+            return
+        with self._lock:
+            for key in self._get_keys(str(path), page, page_count, to_pixmap):
+                if key not in self._cache and key not in self._pending:
+                    self._pending[key] = None
+            while len(self._pending) > _PENDING_MAX_SIZE:
+                self._pending.popitem(last=False)
+            if not self._pending:
+                return
+            if self._thread is None:
+                self._thread = Thread(
+                    target=self._run, name=self.__class__.__name__, daemon=True
+                )
+                self._thread.start()
+            self._lock.notify()
+
+    def _add(self, key, mtime, data):
+        """Add a page, evicting the least recently used."""
+        with self._lock:
+            if old := self._cache.pop(key, None):
+                self._size -= len(old[1])
+            self._cache[key] = (mtime, data)
+            self._size += len(data)
+            while self._size > self._max_bytes:
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _read_page(self, key):
+        """Decompress one page."""
+        path, page, to_pixmap = key
+        try:
+            mtime = Path(path).stat().st_mtime_ns
+            stored_range, data = COMIC_ARCHIVE_POOL.get_page(
+                path, page, to_pixmap=to_pixmap
+            )
+            if stored_range:
+                # Served from the archive file without decompressing.
+                return
+        except Exception as exc:
+            LOG.debug(f"Read ahead {path} page {page}: {exc}")
+            return
+        if data and len(data) <= self._max_bytes:
+            self._add(key, mtime, data)
+
+    def _run(self):
+        """Decompress waiting pages forever."""
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._lock.wait()
+                key, _ = self._pending.popitem(last=False)
+            self._read_page(key)
+
+
+PAGE_READ_AHEAD = PageReadAhead(READ_AHEAD_CACHE_MB * 1024**2)
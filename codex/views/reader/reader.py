@@ -12,6 +12,7 @@ from codex.logger.logger import get_logger
 from codex.serializers.reader import ReaderComicsSerializer, ReaderViewInputSerializer
 from codex.serializers.redirect import ReaderRedirectSerializer
 from codex.views.reader.arcs import ReaderArcsView
+from codex.views.reader.read_ahead import PAGE_READ_AHEAD
 
 LOG = get_logger(__name__)
 
@@ -70,6 +71,8 @@ class ReaderView(ReaderArcsView):
         prev_book = books.get("prev")
         next_book = books.get("next")
         self._lazy_metadata(current, prev_book, next_book)
+        if next_book:
+            PAGE_READ_AHEAD.set_next_book(current.path, next_book.path)
 
         books = {
             "current": current,
@@ -1,10 +1,12 @@
 """Utility classes by many views."""
 
 import json
+import os
 from collections.abc import Mapping
 from contextlib import suppress
 from dataclasses import asdict, dataclass
 from json.decoder import JSONDecodeError
+from pathlib import Path
 from typing import Any
 from urllib.parse import unquote_plus
 
@@ -76,3 +78,15 @@ def chunker(open_file, chunk_size=DEFAULT_CHUNK_SIZE):
                 yield chunk
             else:
                 break
+
+
+def range_chunker(path, offset, length, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Serve a byte range of a file without reading it all into memory."""
+    end = offset + length
+    with Path(path).open("rb") as open_file:
+        fd = open_file.fileno()
+        while offset < end:
+            if not (chunk := os.pread(fd, min(chunk_size, end - offset), offset)):
+                break
+            offset += len(chunk)
+            yield chunk
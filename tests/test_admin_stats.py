@@ -0,0 +1,34 @@
+"""Test admin stats requests."""
+
+from django.http import QueryDict
+from django.test import SimpleTestCase
+
+from codex.serializers.admin.stats import AdminStatsRequestSerializer
+
+
+class AdminStatsRequestTestCase(SimpleTestCase):
+    """Test which config stats can be requested."""
+
+    @staticmethod
+    def _get_serializer(query):
+        return AdminStatsRequestSerializer(data=QueryDict(query))
+
+    def _get_config(self, query):
+        serializer = self._get_serializer(query)
+        assert serializer.is_valid(), serializer.errors
+        return set(serializer.validated_data["config"])
+
+    def test_read_ahead_choices(self):
+        """Test the reader read ahead counters can be requested."""
+        assert self._get_config("config=read_ahead_hits&config=read_ahead_misses") == {
+            "read_ahead_hits",
+            "read_ahead_misses",
+        }
+
+    def test_api_key_choice(self):
+        """Test the api key can be requested."""
+        assert self._get_config("config=api_key") == {"api_key"}
+
+    def test_bad_choice(self):
+        """Test unknown config stats are rejected."""
+        assert not self._get_serializer("config=apikey").is_valid()
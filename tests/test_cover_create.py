@@ -0,0 +1,43 @@
+"""Test cover thumbnail creation."""
+
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from codex.librarian.covers.create import COVER_SIZE_DIMENSIONS, CoverCreateThread
+from codex.librarian.covers.path import COVER_SIZE_2X
+
+SCAN_SIZES = ((1600, 2460), (1988, 3056), (2650, 4096))
+
+
+def _create_jpeg_scan(size):
+    with (
+        Image.effect_noise(size, 64) as noise,
+        noise.convert("RGB") as scan,
+        BytesIO() as buffer,
+    ):
+        scan.save(buffer, "JPEG", quality=90)
+        return buffer.getvalue()
+
+
+def _create_thumbnail_before(scan_data, size):
+    """Create a thumbnail the way Image.thumbnail() does."""
+    with Image.open(BytesIO(scan_data)) as cover_image:
+        cover_image.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        with BytesIO() as buffer:
+            cover_image.save(buffer, "WEBP", method=4)
+            return buffer.getvalue()
+
+
+class CoverCreateTestCase(SimpleTestCase):
+    """Test cover thumbnail creation."""
+
+    def test_jpeg_draft_unchanged(self):
+        """Test drafted JPEG covers match Image.thumbnail() byte for byte."""
+        size = COVER_SIZE_DIMENSIONS[COVER_SIZE_2X]
+        for scan_size in SCAN_SIZES:
+            scan_data = _create_jpeg_scan(scan_size)
+            thumbnails = CoverCreateThread.create_thumbnails(scan_data)
+            before = _create_thumbnail_before(scan_data, size)
+            assert thumbnails[COVER_SIZE_2X] == before, scan_size
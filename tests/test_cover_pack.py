@@ -0,0 +1,83 @@
+"""Test the packed cover store."""
+
+import shutil
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from codex.librarian.covers.pack import CoverPack
+
+TMP_DIR = Path("/tmp/codex.tests.cover_pack")  # noqa: S108
+VARIANT = "1x.webp"
+
+
+class CoverPackTestCase(SimpleTestCase):
+    """Test cover pack writes, reads and compaction."""
+
+    def setUp(self):
+        """Create an empty pack."""
+        TMP_DIR.mkdir(parents=True, exist_ok=True)
+        self.pack = CoverPack(TMP_DIR / "cover-packs")
+
+    def tearDown(self):
+        """Remove the pack."""
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+    def _read(self, pk, *, custom=False, variant=VARIANT):
+        cover_file = self.pack.open(pk, custom, variant)
+        if cover_file is None:
+            return None
+        with cover_file:
+            return cover_file.read()
+
+    def test_round_trip(self):
+        """Test covers read back what was written."""
+        covers = {pk: bytes([pk]) * (pk * 100) for pk in range(1, 5)}
+        self.pack.put_many((pk, False, VARIANT, data) for pk, data in covers.items())
+
+        for pk, data in covers.items():
+            assert self._read(pk) == data
+        assert self._read(1, custom=True) is None
+        assert self._read(1, variant="2x.webp") is None
+        assert self.pack.get_pks(custom=False) == frozenset(covers)
+
+    def test_seek(self):
+        """Test reads stay inside the cover's byte range."""
+        self.pack.put_many(
+            ((1, False, VARIANT, b"first"), (2, False, VARIANT, b"next"))
+        )
+        with self.pack.open(2, custom=False, variant=VARIANT) as cover_file:
+            cover_file.seek(1)
+            assert cover_file.read(2) == b"ex"
+            assert cover_file.read() == b"t"
+            assert cover_file.read() == b""
+
+    def test_missing_marker(self):
+        """Test an empty cover marks a missing cover but never replaces one."""
+        self.pack.put_many(((1, False, VARIANT, b""),))
+        assert self.pack.get(1, custom=False, variant=VARIANT) == (0, 0, 0)
+        self.pack.put_many(((1, False, VARIANT, b"cover"),))
+        self.pack.put_many(((1, False, VARIANT, b""),))
+        assert self._read(1) == b"cover"
+
+    def test_compact(self):
+        """Test compaction frees removed covers and keeps the rest readable."""
+        covers = {pk: bytes([pk]) * 1000 for pk in range(1, 11)}
+        self.pack.put_many((pk, False, VARIANT, data) for pk, data in covers.items())
+        removed_pks = range(1, 6)
+        assert self.pack.remove(removed_pks, custom=False) == len(removed_pks)
+
+        assert self.pack.compact() == 1000 * len(removed_pks)
+        for pk, data in covers.items():
+            assert self._read(pk) == (None if pk in removed_pks else data)
+        shard_paths = tuple(self.pack.root.glob("*.pack"))
+        assert len(shard_paths) == 1
+        assert shard_paths[0].stat().st_size == 1000 * (len(covers) - len(removed_pks))
+        assert self.pack.compact() == 0
+
+    def test_remove_all(self):
+        """Test removing every cover removes the shards."""
+        self.pack.put_many(((1, False, VARIANT, b"cover"),))
+        self.pack.remove_all()
+        assert self._read(1) is None
+        assert not tuple(self.pack.root.glob("*.pack"))
@@ -0,0 +1,98 @@
+"""Test the metadata cache."""
+
+import os
+import shutil
+from pathlib import Path
+from zipfile import ZipFile
+
+from django.test import SimpleTestCase
+
+from codex.librarian.importer.metadata_cache import MetadataCache
+
+TMP_DIR = Path("/tmp/codex.tests.metadata_cache")  # noqa: S108
+
+
+class MetadataCacheTestCase(SimpleTestCase):
+    """Test metadata cache hits, invalidation and culling."""
+
+    COMIC_PATH = TMP_DIR / "comic.cbz"
+
+    def setUp(self):
+        """Create a comic and an empty cache."""
+        TMP_DIR.mkdir(parents=True, exist_ok=True)
+        self._write_comic(b"page")
+        self.cache = MetadataCache(TMP_DIR / "cache", max_size=1024**2)
+        self.extract_count = 0
+
+    def tearDown(self):
+        """Remove the comic and the cache."""
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+    def _write_comic(self, page_data):
+        with ZipFile(self.COMIC_PATH, "w") as zf:
+            zf.writestr("page.jpg", page_data)
+
+    def _extract(self):
+        self.extract_count += 1
+        path = str(self.COMIC_PATH)
+        md = {"path": path, "extract_count": self.extract_count}
+        return md, MetadataCache.get_content_hash(path)
+
+    def _get(self, path=None):
+        return self.cache.get_or_extract(str(path or self.COMIC_PATH), self._extract)
+
+    def _touch(self, path):
+        """Change the mtime without changing the contents."""
+        st = Path(path).stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    def test_hit(self):
+        """Test a second get doesn't extract."""
+        md = self._get()
+        assert self._get() == md
+        assert self.extract_count == 1
+
+    def test_mtime_change(self):
+        """Test an mtime change with the same contents is still a hit."""
+        self._get()
+        self._touch(self.COMIC_PATH)
+        assert self._get()["extract_count"] == 1
+        assert self.extract_count == 1
+
+    def test_content_change(self):
+        """Test a content change with the same size extracts again."""
+        self._get()
+        self._write_comic(b"PAGE")
+        self._touch(self.COMIC_PATH)
+        assert self._get()["extract_count"] == 2  # noqa: PLR2004
+        assert self._get()["extract_count"] == 2  # noqa: PLR2004
+
+    def test_disabled(self):
+        """Test a disabled cache always extracts."""
+        self.cache = MetadataCache(TMP_DIR / "cache", max_size=0)
+        self._get()
+        self._get()
+        assert self.extract_count == 2  # noqa: PLR2004
+
+    def test_cull(self):
+        """Test culling removes the least recently used entries."""
+        paths = []
+        for index in range(4):
+            path = TMP_DIR / f"comic{index}.cbz"
+            shutil.copy(self.COMIC_PATH, path)
+            paths.append(path)
+            self.cache.get_or_extract(str(path), self._extract)
+        entry_paths = [self.cache._get_entry_path(str(path)) for path in paths]  # noqa: SLF001
+        for age, entry_path in enumerate(reversed(entry_paths)):
+            os.utime(entry_path, (1000 - age, 1000 - age))
+        entry_size = entry_paths[0].stat().st_size
+        self.cache.max_size = entry_size * 3
+
+        assert self.cache.cull() == 2  # noqa: PLR2004
+        assert [entry_path.exists() for entry_path in entry_paths] == [
+            False,
+            False,
+            True,
+            True,
+        ]
+        assert self.cache.cull() == 0